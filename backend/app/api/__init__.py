@@ -1,5 +1,5 @@
 # 先导入所有模型
-from app.models import Base, User, Image, Software, Target, Instance, Scene
+from app.models import Base, User, Image, Software, Target, Instance, Scene, Job, AICacheEntry
 
 # 然后导入所有API模块
 from app.api.auth import router as auth_router
@@ -1,12 +1,21 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+import json
 from sqlalchemy.orm import Session
 from app.api import deps
 from app.models.user import User
 from app.models.image import Image
 from app.models.software import Software
-from app.services.ai_service import generate_description, optimize_dockerfile, check_software_compatibility
+from app.services.ai_service import (
+    generate_description, optimize_dockerfile, check_software_compatibility,
+    optimize_dockerfile_stream, check_software_compatibility_stream, ERROR_MESSAGE
+)
+from app.utils.sse import format_sse
+from app.utils.dockerfile_optimizer import optimize as optimize_dockerfile_rules
+from app.services.compatibility import check_compatibility, summarize
+from app.services.ai_cache import ai_cache
 import logging
 import requests
 from app.core.config import settings
@@ -18,25 +27,53 @@ router = APIRouter()
 class GenerateDescriptionRequest(BaseModel):
     image: Dict[str, Any]
     software_list: List[Dict[str, Any]]
+    bypass_cache: bool = False  # 跳过缓存重新生成
 
 class OptimizeDockerfileRequest(BaseModel):
     dockerfile: str
+    deep: bool = False  # 在规则优化的基础上再由 AI 深度优化
+    bypass_cache: bool = False
 
 class CompatibilityCheckRequest(BaseModel):
     base_image_id: int
     software_ids: List[int]
+    deep: bool = False  # 本地规则已能判定时仍调用 AI 分析
+    bypass_cache: bool = False
+
+class BulkCompatibilityCheckRequest(BaseModel):
+    image_ids: List[int]
+    software_ids: List[int]
 
 class GenerateResponse(BaseModel):
     result: str
 
+class OptimizeDockerfileResponse(BaseModel):
+    result: str
+    changes: List[Dict[str, Any]] = []  # 规则优化所做的修改
+    deep: bool = False
+
+class CompatibilityCheckResponse(BaseModel):
+    result: str
+    compatible: bool
+    findings: List[Dict[str, Any]] = []  # 本地规则检查发现的问题
+    unresolved: List[str] = []  # 本地规则无法判定的原因
+    source: str  # rules: 本地规则结论；ai: AI 分析结果
+
 # API 端点
+@router.get("/cache/stats")
+def get_cache_stats():
+    """
+    AI 响应缓存统计（条目数、命中/未命中次数）
+    """
+    return ai_cache.stats()
+
 @router.post("/generate_description", response_model=GenerateResponse)
 async def generate_description_api(request: GenerateDescriptionRequest):
     """
     生成环境描述 API 端点
     """
     try:
-        result = await generate_description(request.image, request.software_list)
+        result = await generate_description(request.image, request.software_list, request.bypass_cache)
         return {"result": result}
     except Exception as e:
         logger.error(f"Error in generate_description_api: {str(e)}")
@@ -45,14 +82,19 @@ async def generate_description_api(request: GenerateDescriptionRequest):
             detail=f"Error generating description: {str(e)}"
         )
 
-@router.post("/optimize_dockerfile", response_model=GenerateResponse)
+@router.post("/optimize_dockerfile", response_model=OptimizeDockerfileResponse)
 async def optimize_dockerfile_api(request: OptimizeDockerfileRequest):
     """
     优化 Dockerfile API 端点
+    - 默认只做本地规则优化（合并 RUN、清理包缓存、调整元数据指令顺序）
+    - deep: 在规则优化结果的基础上调用 AI 深度优化
     """
     try:
-        result = await optimize_dockerfile(request.dockerfile)
-        return {"result": result}
+        optimized = optimize_dockerfile_rules(request.dockerfile)
+        result = optimized["dockerfile"]
+        if request.deep:
+            result = await optimize_dockerfile(result, request.bypass_cache)
+        return {"result": result, "changes": optimized["changes"], "deep": request.deep}
     except Exception as e:
         logger.error(f"Error in optimize_dockerfile_api: {str(e)}")
         raise HTTPException(
@@ -60,44 +102,153 @@ async def optimize_dockerfile_api(request: OptimizeDockerfileRequest):
             detail=f"Error optimizing Dockerfile: {str(e)}"
         )
 
-@router.post("/check_compatibility", response_model=GenerateResponse)
+def _compatibility_inputs(db: Session, request: CompatibilityCheckRequest) -> Tuple[dict, List[dict], dict]:
+    """
+    查询兼容性检查所需的基础镜像与软件信息，并执行本地规则检查
+    """
+    # 获取基础镜像信息
+    base_image = db.query(Image).filter(Image.id == request.base_image_id).first()
+    if not base_image:
+        raise HTTPException(status_code=404, detail="Base image not found")
+        
+    # 获取软件列表信息
+    software_list = db.query(Software).filter(Software.id.in_(request.software_ids)).all()
+    if not software_list:
+        raise HTTPException(status_code=404, detail="Software not found")
+    
+    # 转换为字典格式
+    base_image_dict = {
+        "name": base_image.name,
+        "version": base_image.version,
+        "architecture": base_image.architecture
+    }
+    
+    software_list_dict = [{
+        "name": sw.name,
+        "version": sw.version,
+        "architecture": sw.architecture
+    } for sw in software_list]
+    
+    return base_image_dict, software_list_dict, check_compatibility(base_image, software_list)
+
+def _needs_ai(request: CompatibilityCheckRequest, report: dict) -> bool:
+    """
+    本地规则无法给出结论或显式要求深度分析时才调用 AI
+    """
+    return request.deep or not report["resolved"]
+
+@router.post("/check_compatibility", response_model=CompatibilityCheckResponse)
 async def check_compatibility_api(
     *,
     db: Session = Depends(deps.get_db),
     request: CompatibilityCheckRequest
 ):
-    """检查兼容性"""
+    """
+    检查兼容性
+    - 先用本地规则检查架构、操作系统、包管理器与端口冲突，能判定时直接返回
+    - 存在无法判定的项或 deep 为 true 时再调用 AI
+    """
     try:
-        # 获取基础镜像信息
-        base_image = db.query(Image).filter(Image.id == request.base_image_id).first()
-        if not base_image:
-            raise HTTPException(status_code=404, detail="Base image not found")
-            
-        # 获取软件列表信息
-        software_list = db.query(Software).filter(Software.id.in_(request.software_ids)).all()
-        if not software_list:
-            raise HTTPException(status_code=404, detail="Software not found")
-        
-        # 转换为字典格式
-        base_image_dict = {
-            "name": base_image.name,
-            "version": base_image.version,
-            "architecture": base_image.architecture
+        base_image_dict, software_list_dict, report = _compatibility_inputs(db, request)
+        response = {
+            "compatible": report["compatible"],
+            "findings": report["findings"],
+            "unresolved": report["unresolved"],
         }
-        
-        software_list_dict = [{
-            "name": sw.name,
-            "version": sw.version,
-            "architecture": sw.architecture
-        } for sw in software_list]
+        if not _needs_ai(request, report):
+            return {**response, "result": summarize(report), "source": "rules"}
         
         # 调用兼容性检查服务
-        result = await check_software_compatibility(base_image_dict, software_list_dict)
-        return {"result": result}
+        result = await check_software_compatibility(base_image_dict, software_list_dict, request.bypass_cache)
+        return {**response, "result": result, "source": "ai"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in check_compatibility_api: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Error checking compatibility: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+def sse_response(chunks: AsyncIterator[str], events: Optional[Dict[str, Any]] = None) -> StreamingResponse:
+    """
+    将生成的文本以 SSE 推送：每段文本一条消息，结束时发送包含完整结果的 done 事件，出错时发送 error 事件。
+    events 中的每一项先以 JSON 作为同名事件发送（如规则优化的 changes、兼容性检查的 findings）。
+    客户端断开时生成器被取消，上游 AI 请求随之关闭
+    """
+    async def generate():
+        parts = []
+        try:
+            for event, payload in (events or {}).items():
+                yield format_sse(json.dumps(payload, ensure_ascii=False), event=event)
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield format_sse(chunk)
+            yield format_sse("".join(parts), event="done")
+        except Exception as e:
+            logger.error(f"Error streaming AI response: {str(e)}")
+            yield format_sse(ERROR_MESSAGE, event="error")
+        finally:
+            await chunks.aclose()
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/optimize_dockerfile/stream")
+async def optimize_dockerfile_stream_api(request: OptimizeDockerfileRequest):
+    """
+    流式优化 Dockerfile（SSE），deep 为 false 时直接返回规则优化结果
+    """
+    optimized = optimize_dockerfile_rules(request.dockerfile)
+    if request.deep:
+        chunks = optimize_dockerfile_stream(optimized["dockerfile"], request.bypass_cache)
+    else:
+        chunks = _single(optimized["dockerfile"])
+    return sse_response(chunks, {"changes": optimized["changes"]})
+
+@router.post("/check_compatibility/stream")
+async def check_compatibility_stream_api(
+    *,
+    db: Session = Depends(deps.get_db),
+    request: CompatibilityCheckRequest
+):
+    """
+    流式检查兼容性（SSE），先发送本地规则检查结果，能判定时不调用 AI
+    """
+    base_image_dict, software_list_dict, report = _compatibility_inputs(db, request)
+    if _needs_ai(request, report):
+        chunks = check_software_compatibility_stream(base_image_dict, software_list_dict, request.bypass_cache)
+    else:
+        chunks = _single(summarize(report))
+    return sse_response(chunks, {"findings": report})
+
+@router.post("/check_compatibility/bulk")
+def check_compatibility_bulk_api(
+    *,
+    db: Session = Depends(deps.get_db),
+    request: BulkCompatibilityCheckRequest
+):
+    """
+    批量检查镜像 × 软件组合的兼容性，仅使用本地规则，不调用 AI；
+    resolved 为 false 的组合可再通过 /check_compatibility 交由 AI 分析
+    """
+    images = db.query(Image).filter(Image.id.in_(request.image_ids)).all()
+    software_list = db.query(Software).filter(Software.id.in_(request.software_ids)).all()
+    if not images:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if not software_list:
+        raise HTTPException(status_code=404, detail="Software not found")
+
+    results = []
+    for image in images:
+        for software in software_list:
+            report = check_compatibility(image, [software])
+            results.append({"image_id": image.id, "software_id": software.id, **report})
+    return {"results": results}
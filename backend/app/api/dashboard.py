@@ -1,102 +1,151 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import func, literal, select, union_all
 from sqlalchemy.orm import Session
-from typing import List
-import psutil
+from typing import Optional
+import hashlib
+import json
+import threading
+import time
 
 from app.api.deps import get_db
+from app.core.config import settings
 from app.models.image import Image
 from app.models.instance import Instance
 from app.models.target import Target
 from app.models.software import Software
 from app.models.scene import Scene
-from app.schemas.dashboard import DashboardStats, Activity, ResourceUsage
+from app.schemas.dashboard import DashboardStats, Activity, ResourceUsage, ResourceHistory, ContainerUsage
+from app.services.stats_collector import stats_collector
+from app.services.system_metrics import system_metrics
 
 router = APIRouter()
 
-@router.get("/stats", response_model=DashboardStats)
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    # 获取各个模型的总数
-    total_images = db.query(Image).count()
-    total_instances = db.query(Instance).count()
-    total_targets = db.query(Target).count()
-    total_software = db.query(Software).count()
+# 最近活动的来源表及显示类型
+ACTIVITY_SOURCES = (
+    (Image, "新增镜像"),
+    (Instance, "新增实例"),
+    (Software, "新增软件"),
+    (Target, "新增靶标"),
+    (Scene, "新增场景"),
+)
+RECENT_PER_SOURCE = 3  # 每个表取最新的记录数
+RECENT_LIMIT = 5  # 返回的最近活动数
+
+_summary_cache: dict = {"expires": 0.0, "value": None}
+_summary_lock = threading.Lock()
 
-    # 获取最近的活动（这里示例从各个表获取最新的记录）
-    recent_activities: List[Activity] = []
-    
-    # 获取最新的镜像
-    recent_images = db.query(Image).order_by(Image.created_at.desc()).limit(3).all()
-    for image in recent_images:
-        recent_activities.append(Activity(
-            id=image.id,
-            type="新增镜像",
-            name=image.name,
-            createdAt=image.created_at.isoformat()
-        ))
+def _query_summary(db: Session) -> dict:
+    """
+    一次聚合查询获取各模型总数，一次 UNION 查询获取最近活动（只读取 id/name/created_at）
+    """
+    counts = db.execute(select(
+        select(func.count(Image.id)).scalar_subquery().label("images"),
+        select(func.count(Instance.id)).scalar_subquery().label("instances"),
+        select(func.count(Target.id)).scalar_subquery().label("targets"),
+        select(func.count(Software.id)).scalar_subquery().label("software"),
+    )).one()
 
-    # 获取最新的实例
-    recent_instances = db.query(Instance).order_by(Instance.created_at.desc()).limit(3).all()
-    for instance in recent_instances:
-        recent_activities.append(Activity(
-            id=instance.id,
-            type="新增实例",
-            name=instance.name,
-            createdAt=instance.created_at.isoformat()
-        ))
+    branches = []
+    for model, activity_type in ACTIVITY_SOURCES:
+        latest = (
+            select(
+                model.id.label("id"),
+                literal(activity_type).label("type"),
+                model.name.label("name"),
+                model.created_at.label("created_at"),
+            )
+            .order_by(model.created_at.desc())
+            .limit(RECENT_PER_SOURCE)
+            .subquery()
+        )
+        branches.append(select(latest))
+    recent = union_all(*branches).subquery()
+    rows = db.execute(
+        select(recent).order_by(recent.c.created_at.desc()).limit(RECENT_LIMIT)
+    ).all()
 
-    # 获取最新的软件
-    recent_software = db.query(Software).order_by(Software.created_at.desc()).limit(3).all()
-    for software in recent_software:
-        recent_activities.append(Activity(
-            id=software.id,
-            type="新增软件",
-            name=software.name,
-            createdAt=software.created_at.isoformat()
-        ))
+    return {
+        "totalImages": counts.images,
+        "totalInstances": counts.instances,
+        "totalTargets": counts.targets,
+        "totalSoftware": counts.software,
+        "recentActivities": [
+            Activity(id=row.id, type=row.type, name=row.name, createdAt=row.created_at.isoformat())
+            for row in rows
+        ],
+    }
 
-    # 获取最新的靶标
-    recent_targets = db.query(Target).order_by(Target.created_at.desc()).limit(3).all()
-    for target in recent_targets:
-        recent_activities.append(Activity(
-            id=target.id,
-            type="新增靶标",
-            name=target.name,
-            createdAt=target.created_at.isoformat()
-        ))
+def _get_summary(db: Session) -> dict:
+    """
+    读取计数与最近活动，结果缓存 DASHBOARD_CACHE_TTL 秒
+    """
+    with _summary_lock:
+        if _summary_cache["value"] is not None and time.monotonic() < _summary_cache["expires"]:
+            return _summary_cache["value"]
+    value = _query_summary(db)
+    with _summary_lock:
+        _summary_cache["value"] = value
+        _summary_cache["expires"] = time.monotonic() + settings.DASHBOARD_CACHE_TTL
+    return value
 
-    # 获取最新的场景
-    recent_scenes = db.query(Scene).order_by(Scene.created_at.desc()).limit(3).all()
-    for scene in recent_scenes:
-        recent_activities.append(Activity(
-            id=scene.id,
-            type="新增场景",
-            name=scene.name,
-            createdAt=scene.created_at.isoformat()
-        ))
+@router.get("/stats", response_model=DashboardStats)
+def get_dashboard_stats(
+    request: Request,
+    db: Session = Depends(get_db),
+    history: Optional[int] = Query(None, ge=1, le=86400),
+):
+    """
+    仪表盘统计
+    - history: 附带最近 history 秒内的主机资源序列（用于图表）
+    - 响应带 ETag，If-None-Match 与之相同时返回 304
+    """
+    summary = _get_summary(db)
 
-    # 获取系统资源使用情况
-    # CPU使用率需要一个短暂的时间间隔来计算
-    cpu_usage = psutil.cpu_percent(interval=1)
-    
-    # 获取内存使用情况
-    memory = psutil.virtual_memory()
-    memory_usage = memory.percent
-    
-    # 获取根目录的磁盘使用情况
-    disk = psutil.disk_usage('/')
-    disk_usage = disk.percent
-    
+    # 获取系统资源使用情况，直接读取后台采样器的最新样本
+    sample = system_metrics.latest()
     resource_usage = ResourceUsage(
-        cpuUsage=round(cpu_usage, 1),
-        memoryUsage=round(memory_usage, 1),
-        diskUsage=round(disk_usage, 1)
+        cpuUsage=round(sample["cpu_percent"], 1),
+        memoryUsage=round(sample["memory_percent"], 1),
+        diskUsage=round(sample["disk_percent"], 1),
+        load1=round(sample["load_1"], 2),
+        load5=round(sample["load_5"], 2),
+        load15=round(sample["load_15"], 2)
+    )
+
+    resource_history = None
+    if history:
+        series = system_metrics.history(history)
+        resource_history = ResourceHistory(
+            timestamps=series["timestamp"],
+            cpuUsage=[round(v, 1) for v in series["cpu_percent"]],
+            memoryUsage=[round(v, 1) for v in series["memory_percent"]],
+            diskUsage=[round(v, 1) for v in series["disk_percent"]],
+            load1=[round(v, 2) for v in series["load_1"]]
+        )
+
+    # 平台容器资源汇总，直接读取采集器缓冲区
+    totals = stats_collector.totals()
+    container_usage = ContainerUsage(
+        containers=totals["containers"],
+        cpuPercent=totals["cpu_percent"],
+        memoryUsage=totals["memory_usage"]
+    )
+
+    stats = DashboardStats(
+        **summary,
+        resourceUsage=resource_usage,
+        containerUsage=container_usage,
+        resourceHistory=resource_history
     )
 
-    return DashboardStats(
-        totalImages=total_images,
-        totalInstances=total_instances,
-        totalTargets=total_targets,
-        totalSoftware=total_software,
-        recentActivities=sorted(recent_activities, key=lambda x: x.createdAt, reverse=True)[:5],
-        resourceUsage=resource_usage
-    ) 
\ No newline at end of file
+    content = jsonable_encoder(stats)
+    etag = '"' + hashlib.sha1(json.dumps(content, sort_keys=True).encode()).hexdigest() + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={int(settings.DASHBOARD_CACHE_TTL)}",
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
@@ -19,7 +19,7 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-async def get_current_user(
+def get_current_user(
     db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ) -> User:
@@ -1,45 +1,47 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from app.api import deps
 from app.schemas.image import Image, ImageCreate, ImageUpdate
 from app.models.image import Image as ImageModel
 from app.models.user import User
+from app.db.search import search_index
+from app.utils.pagination import paginate, count_cache, set_page_headers
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Image])
 def list_images(
+    response: Response,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     search: Optional[str] = None,
     architecture: Optional[str] = None,
     current_user: User = Depends(deps.get_current_user),
 ):
     """
     获取镜像列表
-    - search: 搜索关键词(名称或描述)
+    - search: 搜索关键词(名称或描述)，按相关度排序，支持前缀匹配
     - architecture: 架构筛选
+    - cursor: 上一页响应头 X-Next-Cursor 返回的游标，按 (created_at, id) 继续翻页
+    - include_total: 在响应头 X-Total-Count 中返回总数（缓存的近似值）
     """
     query = db.query(ImageModel)
     
     # 添加搜索条件
     if search:
-        query = query.filter(
-            or_(
-                ImageModel.name.ilike(f"%{search}%"),
-                ImageModel.description.ilike(f"%{search}%")
-            )
-        )
+        query = search_index.apply(query, ImageModel, search)
     
     # 添加架构筛选
     if architecture:
         query = query.filter(ImageModel.architecture == architecture)
     
-    # 分页
-    images = query.offset(skip).limit(limit).all()
+    # 分页：搜索结果按相关度排序，游标记录偏移量
+    images, next_cursor = paginate(query, ImageModel, limit=limit, skip=skip, cursor=cursor, keyset=not search)
+    set_page_headers(response, next_cursor, count_cache.count(query) if include_total else None)
     return images
 
 @router.post("/", response_model=Image)
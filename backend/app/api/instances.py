@@ -1,72 +1,128 @@
-from typing import List, Dict
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from typing import List, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.api import deps
-from app.schemas.instance import Instance, InstanceCreate, InstanceUpdate
+from app.schemas.instance import Instance, InstanceCreate, InstanceUpdate, InstanceWithState, ContainerState
+from app.schemas.job import Job
 from app.models.instance import Instance as InstanceModel
 from app.models.target import Target as TargetModel
+from app.models.job import Job as JobModel
 from app.models.user import User
-from app.utils import docker
+from app.utils import build_logs
+from app.utils.docker_async import async_docker
+from app.utils.logs import iter_lines, iter_timestamped, encode_cursor, decode_cursor
+from app.utils.batch import run_parallel
+from app.utils.pagination import paginate, count_cache, set_page_headers
+from app.core.config import settings
+from app.services.job_service import enqueue, job_queue, build_in_progress, delete_jobs
+from app.services.container_state import state_cache, STATUS_MAP
+from app.services.stats_collector import stats_collector
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-def build_and_start_instance(db: Session, instance_id: int):
-    """
-    后台任务：构建并启动实例
-    """
+# 异步端点中的数据库操作通过 run_in_threadpool 在线程池执行，避免阻塞事件循环
+def _get_instance(db: Session, instance_id: int) -> InstanceModel:
     instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
     if not instance:
-        return
-    
-    try:
-        # 构建镜像
-        image_tag = docker.build_image(instance.target)
-        if not image_tag:
-            instance.status = "failed"
-            db.commit()
-            return
-        
-        # 创建并启动容器
-        container_id = docker.create_container(
-            image_tag,
-            f"instance-{instance.id}",
-            instance.ports,
-            instance.environment
-        )
-        
-        if container_id:
-            instance.container_id = container_id
-            instance.status = "running"
-        else:
-            instance.status = "failed"
-        
-        db.commit()
-    except Exception as e:
-        logger.error(f"Error in build_and_start_instance: {str(e)}", exc_info=True)
-        instance.status = "failed"
-        db.commit()
+        raise HTTPException(status_code=404, detail="Instance not found")
+    return instance
+
+def _get_instances(db: Session, instance_ids: List[int]) -> Dict[int, InstanceModel]:
+    return {
+        instance.id: instance
+        for instance in db.query(InstanceModel).filter(InstanceModel.id.in_(instance_ids)).all()
+    }
 
-@router.get("/", response_model=List[Instance])
-def list_instances(
+def _set_status(db: Session, instance: InstanceModel, status: str) -> None:
+    instance.status = status
+    db.commit()
+
+@router.get("/", response_model=List[InstanceWithState])
+async def list_instances(
+    response: Response,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    status: Optional[str] = None,
+    live: bool = False,
     current_user: User = Depends(deps.get_current_user),
 ):
     """
     获取实例列表
+    - status: 状态筛选(creating/running/stopped/failed)
+    - live: 附带容器实时状态（一次 Docker 调用获取全部容器）
+    - cursor: 上一页响应头 X-Next-Cursor 返回的游标，按 (created_at, id) 继续翻页
+    - include_total: 在响应头 X-Total-Count 中返回总数（缓存的近似值）
     """
-    instances = db.query(InstanceModel).offset(skip).limit(limit).all()
-    return instances
+    containers = await async_docker.list_managed_containers() if live else None
+    return await run_in_threadpool(
+        _list_page, db, response, containers, skip, limit, cursor, include_total, status
+    )
+
+def _list_page(
+    db: Session,
+    response: Response,
+    containers: Optional[Dict[str, dict]],
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    include_total: bool,
+    status: Optional[str]
+) -> List[InstanceWithState]:
+    """
+    读取一页实例并在线程池中完成序列化（含关联的靶标）
+    """
+    query = db.query(InstanceModel)
+    if status:
+        query = query.filter(_status_filter(status, containers))
+    instances, next_cursor = paginate(query, InstanceModel, limit=limit, skip=skip, cursor=cursor)
+    set_page_headers(response, next_cursor, count_cache.count(query) if include_total else None)
+    
+    items = [InstanceWithState.model_validate(instance, from_attributes=True) for instance in instances]
+    for item in items:
+        summary = containers.get(item.container_id) if containers and item.container_id else None
+        if summary:
+            item.live = ContainerState(
+                state=summary["State"],
+                status=summary["Status"],
+                image=summary.get("Image"),
+                ports=summary.get("Ports") or []
+            )
+            item.status = STATUS_MAP.get(summary["State"], "stopped")
+    return items
+
+def _status_filter(status: str, containers: Optional[Dict[str, dict]]):
+    """
+    状态筛选条件；实时模式下以容器实际状态为准：
+    容器存在时按其状态匹配，没有容器或容器已不存在时按数据库中的状态匹配
+    """
+    if containers is None:
+        return InstanceModel.status == status
+    matching = [
+        container_id for container_id, summary in containers.items()
+        if STATUS_MAP.get(summary["State"], "stopped") == status
+    ]
+    return or_(
+        InstanceModel.container_id.in_(matching),
+        and_(
+            InstanceModel.status == status,
+            or_(InstanceModel.container_id.is_(None), InstanceModel.container_id.notin_(list(containers)))
+        )
+    )
 
 @router.post("/", response_model=Instance)
 def create_instance(
     *,
     db: Session = Depends(deps.get_db),
     instance_in: InstanceCreate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(deps.get_current_user),
 ):
     """
@@ -86,11 +142,13 @@ def create_instance(
         )
         
         db.add(instance)
+        db.flush()
+        
+        # 加入持久化构建队列，由构建工作线程处理
+        enqueue(db, "build", instance.id)
         db.commit()
         db.refresh(instance)
-        
-        # 添加后台任务
-        background_tasks.add_task(build_and_start_instance, db, instance.id)
+        job_queue.flush_notifications(db)
         
         return instance
     except Exception as e:
@@ -101,6 +159,113 @@ def create_instance(
             detail=f"An error occurred while creating instance: {str(e)}"
         )
 
+# 批量操作路由需在 /{instance_id} 路由之前注册
+def _batch_params(parallelism: Optional[int], timeout: Optional[float]) -> tuple:
+    parallelism = min(max(1, parallelism or settings.BATCH_PARALLELISM), 64)
+    timeout = timeout if timeout and timeout > 0 else settings.BATCH_CALL_TIMEOUT
+    return parallelism, timeout
+
+def _batch_response(instance_ids: List[int], outcomes: Dict[int, dict]) -> dict:
+    items = []
+    for instance_id in instance_ids:
+        outcome = outcomes.get(instance_id, {"ok": False, "elapsed_ms": 0, "error": "Instance not found"})
+        items.append({"id": instance_id, **outcome})
+    return {
+        "results": {item["id"]: item["ok"] for item in items},
+        "items": items
+    }
+
+@router.post("/batch/stop")
+async def batch_stop_instances(
+    *,
+    db: Session = Depends(deps.get_db),
+    instance_ids: List[int],
+    parallelism: Optional[int] = None,
+    timeout: Optional[float] = None,
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    批量停止实例
+    - parallelism: 并发数（默认 BATCH_PARALLELISM）
+    - timeout: 单个实例的超时时间（秒，默认 BATCH_CALL_TIMEOUT）
+    """
+    parallelism, timeout = _batch_params(parallelism, timeout)
+    instances = await run_in_threadpool(_get_instances, db, instance_ids)
+    
+    outcomes: Dict[int, dict] = {
+        instance_id: {"ok": False, "elapsed_ms": 0, "error": "No container found"}
+        for instance_id, instance in instances.items() if not instance.container_id
+    }
+    runnable = [instance_id for instance_id, instance in instances.items() if instance.container_id]
+    outcomes.update(await run_parallel(
+        lambda instance_id: async_docker.stop_container(instances[instance_id].container_id),
+        runnable,
+        parallelism,
+        timeout
+    ))
+    
+    # 所有数据库变更在一个事务中提交
+    def commit():
+        for instance_id in runnable:
+            if outcomes[instance_id]["ok"]:
+                instance = instances[instance_id]
+                state_cache.invalidate(instance.container_id)
+                instance.status = "stopped"
+        db.commit()
+    await run_in_threadpool(commit)
+    
+    return _batch_response(instance_ids, outcomes)
+
+@router.post("/batch/delete")
+async def batch_delete_instances(
+    *,
+    db: Session = Depends(deps.get_db),
+    instance_ids: List[int],
+    parallelism: Optional[int] = None,
+    timeout: Optional[float] = None,
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    批量删除实例
+    - parallelism: 并发数（默认 BATCH_PARALLELISM）
+    - timeout: 单个实例的超时时间（秒，默认 BATCH_CALL_TIMEOUT）
+    """
+    parallelism, timeout = _batch_params(parallelism, timeout)
+    instances = await run_in_threadpool(_get_instances, db, instance_ids)
+    
+    async def remove(instance_id: int) -> bool:
+        container_id = instances[instance_id].container_id
+        return await async_docker.remove_container(container_id) if container_id else True
+    
+    outcomes = await run_parallel(
+        remove,
+        list(instances),
+        parallelism,
+        timeout
+    )
+    
+    # 容器删除成功的实例在一个事务中统一删除
+    def commit():
+        deleted = [instance_id for instance_id, outcome in outcomes.items() if outcome["ok"]]
+        delete_jobs(db, deleted)
+        for instance_id in deleted:
+            instance = instances[instance_id]
+            if instance.container_id:
+                state_cache.invalidate(instance.container_id)
+            db.delete(instance)
+        db.commit()
+        for instance_id in deleted:
+            build_logs.remove(instance_id)
+    
+    try:
+        await run_in_threadpool(commit)
+    except Exception as e:
+        logger.error(f"Error deleting instances: {str(e)}", exc_info=True)
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=500, detail=f"An error occurred while deleting instances: {str(e)}")
+    
+    return _batch_response(instance_ids, outcomes)
+
 @router.get("/{instance_id}", response_model=Instance)
 def get_instance(
     *,
@@ -116,30 +281,63 @@ def get_instance(
         raise HTTPException(status_code=404, detail="Instance not found")
     return instance
 
-@router.post("/{instance_id}/stop")
-def stop_instance(
+@router.get("/{instance_id}/jobs", response_model=List[Job])
+def list_instance_jobs(
     *,
     db: Session = Depends(deps.get_db),
     instance_id: int,
     current_user: User = Depends(deps.get_current_user),
 ):
     """
-    停止实例
+    获取实例的构建/启动任务
+    """
+    instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
+    if not instance:
+        raise HTTPException(status_code=404, detail="Instance not found")
+    
+    return db.query(JobModel).filter(JobModel.instance_id == instance_id).order_by(JobModel.id).all()
+
+@router.get("/{instance_id}/build-logs")
+def stream_instance_build_logs(
+    *,
+    db: Session = Depends(deps.get_db),
+    instance_id: int,
+    offset: int = 0,
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    以 SSE 流式获取实例构建日志
+    - offset: 起始字节偏移（断线重连时使用最后收到的事件 id）
     """
     instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
     if not instance:
         raise HTTPException(status_code=404, detail="Instance not found")
     
+    return build_logs.build_log_response(instance_id, offset, last_event_id, lambda: build_in_progress(instance_id))
+
+@router.post("/{instance_id}/stop")
+async def stop_instance(
+    *,
+    db: Session = Depends(deps.get_db),
+    instance_id: int,
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    停止实例
+    """
+    instance = await run_in_threadpool(_get_instance, db, instance_id)
+    
     if instance.container_id:
-        if docker.stop_container(instance.container_id):
-            instance.status = "stopped"
-            db.commit()
+        if await async_docker.stop_container(instance.container_id):
+            state_cache.invalidate(instance.container_id)
+            await run_in_threadpool(_set_status, db, instance, "stopped")
             return {"ok": True}
     
     raise HTTPException(status_code=400, detail="Failed to stop instance")
 
 @router.delete("/{instance_id}")
-def delete_instance(
+async def delete_instance(
     *,
     db: Session = Depends(deps.get_db),
     instance_id: int,
@@ -148,20 +346,23 @@ def delete_instance(
     """
     删除实例
     """
-    instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
-    if not instance:
-        raise HTTPException(status_code=404, detail="Instance not found")
+    instance = await run_in_threadpool(_get_instance, db, instance_id)
     
     # 如果容器存在，先删除容器
     if instance.container_id:
-        docker.remove_container(instance.container_id)
+        await async_docker.remove_container(instance.container_id)
+        state_cache.invalidate(instance.container_id)
     
-    db.delete(instance)
-    db.commit()
+    def delete():
+        delete_jobs(db, [instance_id])
+        db.delete(instance)
+        db.commit()
+        build_logs.remove(instance_id)
+    await run_in_threadpool(delete)
     return {"ok": True}
 
 @router.get("/{instance_id}/status")
-def get_instance_status(
+async def get_instance_status(
     *,
     db: Session = Depends(deps.get_db),
     instance_id: int,
@@ -170,21 +371,19 @@ def get_instance_status(
     """
     获取实例运行状态
     """
-    instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
-    if not instance:
-        raise HTTPException(status_code=404, detail="Instance not found")
+    instance = await run_in_threadpool(_get_instance, db, instance_id)
     
     if not instance.container_id:
         return {"status": instance.status}
     
-    status = docker.get_container_status(instance.container_id)
+    status = await state_cache.aget(instance.container_id)
     if not status:
         return {"status": "unknown"}
     
     return status
 
 @router.get("/{instance_id}/logs")
-def get_instance_logs(
+async def get_instance_logs(
     *,
     db: Session = Depends(deps.get_db),
     instance_id: int,
@@ -194,119 +393,155 @@ def get_instance_logs(
     """
     获取实例日志
     """
-    instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
-    if not instance:
-        raise HTTPException(status_code=404, detail="Instance not found")
+    instance = await run_in_threadpool(_get_instance, db, instance_id)
     
     if not instance.container_id:
         return {"logs": "No container found"}
     
-    logs = docker.get_container_logs(instance.container_id, tail)
+    logs = await async_docker.get_container_logs(instance.container_id, tail)
     if logs is None:
         raise HTTPException(status_code=400, detail="Failed to get logs")
     
     return {"logs": logs}
 
-@router.post("/{instance_id}/restart")
-def restart_instance(
+@router.get("/{instance_id}/logs/stream")
+async def stream_instance_logs(
     *,
     db: Session = Depends(deps.get_db),
     instance_id: int,
+    follow: bool = False,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    tail: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: str = "all",
+    max_bytes: Optional[int] = None,
+    max_lines: Optional[int] = None,
     current_user: User = Depends(deps.get_current_user),
 ):
     """
-    重启实例
+    流式获取实例日志（NDJSON，每行一条日志，最后一行为游标信息）
+    - follow: 持续跟踪新日志
+    - since/until: 起止时间（Unix 秒）
+    - tail: 从末尾开始的行数（默认 100，指定 since 或 cursor 时为全部）
+    - cursor: 上次返回的游标，从断点继续
+    - stream: all/stdout/stderr
+    - max_bytes/max_lines: 本次返回上限（不超过服务端配置）
     """
-    instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
-    if not instance:
-        raise HTTPException(status_code=404, detail="Instance not found")
+    instance = await run_in_threadpool(_get_instance, db, instance_id)
     
     if not instance.container_id:
-        raise HTTPException(status_code=400, detail="No container to restart")
+        raise HTTPException(status_code=400, detail="No container found")
     
-    if docker.restart_container(instance.container_id):
-        instance.status = "running"
-        db.commit()
-        return {"ok": True}
+    if stream not in ("all", "stdout", "stderr"):
+        raise HTTPException(status_code=400, detail="stream must be one of all, stdout, stderr")
     
-    raise HTTPException(status_code=400, detail="Failed to restart instance")
-
-@router.post("/batch/stop")
-def batch_stop_instances(
-    *,
-    db: Session = Depends(deps.get_db),
-    instance_ids: List[int],
-    current_user: User = Depends(deps.get_current_user),
-):
-    """
-    批量停止实例
-    """
-    results: Dict[int, bool] = {}
-    for instance_id in instance_ids:
-        instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
-        if instance and instance.container_id:
-            success = docker.stop_container(instance.container_id)
-            if success:
-                instance.status = "stopped"
-                db.commit()
-            results[instance_id] = success
-        else:
-            results[instance_id] = False
+    last_nanos, seen = None, 0
+    if cursor:
+        try:
+            last_nanos, seen = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # 用整数拼出精确的纳秒时间戳，浮点数无法精确表示当前纪元的纳秒值
+        since = f"{last_nanos // 10**9}.{last_nanos % 10**9:09d}"
+    
+    max_bytes = min(max_bytes or settings.LOG_STREAM_MAX_BYTES, settings.LOG_STREAM_MAX_BYTES)
+    max_lines = min(max_lines or settings.LOG_STREAM_MAX_LINES, settings.LOG_STREAM_MAX_LINES)
     
-    return {"results": results}
+    try:
+        frames = await async_docker.stream_container_logs(
+            instance.container_id,
+            follow=follow,
+            since=since,
+            until=until,
+            tail=tail if tail is not None else ("all" if since else 100),
+            stdout=stream != "stderr",
+            stderr=stream != "stdout"
+        )
+    except Exception as e:
+        logger.error(f"Error streaming container logs: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail="Failed to get logs")
+    
+    async def generate():
+        nonlocal last_nanos, seen
+        lines = bytes_sent = 0
+        truncated = False
+        try:
+            async for label, stamp, nanos, text in iter_timestamped(iter_lines(frames), cursor):
+                record = (json.dumps({"ts": stamp, "stream": label, "line": text}, ensure_ascii=False) + "\n").encode("utf-8")
+                if lines >= max_lines or bytes_sent + len(record) > max_bytes:
+                    truncated = True
+                    break
+                seen = seen + 1 if nanos == last_nanos else 1
+                last_nanos = nanos
+                lines += 1
+                bytes_sent += len(record)
+                yield record
+        finally:
+            await frames.aclose()
+        
+        yield json.dumps({
+            "cursor": encode_cursor(last_nanos, seen) if last_nanos is not None else None,
+            "lines": lines,
+            "bytes": bytes_sent,
+            "truncated": truncated
+        }) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
-@router.post("/batch/delete")
-def batch_delete_instances(
+@router.post("/{instance_id}/restart")
+async def restart_instance(
     *,
     db: Session = Depends(deps.get_db),
-    instance_ids: List[int],
+    instance_id: int,
     current_user: User = Depends(deps.get_current_user),
 ):
     """
-    批量删除实例
+    重启实例
     """
-    results: Dict[int, bool] = {}
-    for instance_id in instance_ids:
-        try:
-            instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
-            if instance:
-                if instance.container_id:
-                    docker.remove_container(instance.container_id)
-                db.delete(instance)
-                results[instance_id] = True
-            else:
-                results[instance_id] = False
-        except Exception:
-            results[instance_id] = False
+    instance = await run_in_threadpool(_get_instance, db, instance_id)
     
-    db.commit()
-    return {"results": results}
+    if not instance.container_id:
+        raise HTTPException(status_code=400, detail="No container to restart")
+    
+    if await async_docker.restart_container(instance.container_id):
+        state_cache.invalidate(instance.container_id)
+        await run_in_threadpool(_set_status, db, instance, "running")
+        return {"ok": True}
+    
+    raise HTTPException(status_code=400, detail="Failed to restart instance")
 
 @router.get("/{instance_id}/stats")
-def get_instance_stats(
+async def get_instance_stats(
     *,
     db: Session = Depends(deps.get_db),
     instance_id: int,
+    window: Optional[int] = None,
     current_user: User = Depends(deps.get_current_user),
 ):
     """
     获取实例资源使用统计
+    - window: 返回最近 window 秒内的序列数据
     """
-    instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
-    if not instance:
-        raise HTTPException(status_code=404, detail="Instance not found")
+    instance = await run_in_threadpool(_get_instance, db, instance_id)
     
     if not instance.container_id:
         raise HTTPException(status_code=400, detail="No container found")
     
-    stats = docker.get_container_stats(instance.container_id)
+    # 优先读取后台采集的缓冲区
+    series = stats_collector.get(instance.container_id)
+    snapshot = series.snapshot(window) if series else None
+    if snapshot:
+        return snapshot
+    
+    stats = await async_docker.get_container_stats(instance.container_id)
     if not stats:
         raise HTTPException(status_code=400, detail="Failed to get stats")
     
     return stats
 
 @router.post("/{instance_id}/exec")
-def execute_instance_command(
+async def execute_instance_command(
     *,
     db: Session = Depends(deps.get_db),
     instance_id: int,
@@ -316,14 +551,12 @@ def execute_instance_command(
     """
     在实例中执行命令
     """
-    instance = db.query(InstanceModel).filter(InstanceModel.id == instance_id).first()
-    if not instance:
-        raise HTTPException(status_code=404, detail="Instance not found")
+    instance = await run_in_threadpool(_get_instance, db, instance_id)
     
     if not instance.container_id:
         raise HTTPException(status_code=400, detail="No container found")
     
-    result = docker.execute_command(instance.container_id, command)
+    result = await async_docker.execute_command(instance.container_id, command)
     if not result:
         raise HTTPException(status_code=400, detail="Failed to execute command")
     
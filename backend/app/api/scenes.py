@@ -1,54 +1,47 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, Response, Query
+from sqlalchemy.orm import Session
 from app.api import deps
-from app.schemas.scene import Scene, SceneCreate, SceneUpdate, SceneList
+from app.schemas.scene import Scene, SceneCreate, SceneUpdate, SceneList, TopologyPatch, TopologyPatchResult
 from app.models.scene import Scene as SceneModel
 from app.models.user import User
+from app.db.search import search_index
+from app.utils.pagination import paginate, count_cache, set_page_headers
+from app.utils.json_patch import apply_patch, JsonPatchError
 from datetime import datetime
 
 router = APIRouter()
 
 @router.get("/", response_model=SceneList)
 def list_scenes(
+    response: Response,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
     current_user: User = Depends(deps.get_current_user),
 ):
     """
     获取场景列表
-    - search: 搜索关键词(名称或描述)
+    - search: 搜索关键词(名称或描述)，按相关度排序，支持前缀匹配
+    - cursor: 上一页返回的 next_cursor，按 (created_at, id) 倒序继续翻页
+    - total 为缓存的近似值
+    - 列表项不包含拓扑数据，获取拓扑请使用 GET /scenes/{scene_id}
     """
-    query = db.query(SceneModel)
+    query = SceneModel.summary_query(db)
     
     # 添加搜索条件
     if search:
-        query = query.filter(
-            or_(
-                SceneModel.name.ilike(f"%{search}%"),
-                SceneModel.description.ilike(f"%{search}%")
-            )
-        )
+        query = search_index.apply(query, SceneModel, search)
     
-    # 确保加载关联的用户数据
-    query = query.options(joinedload(SceneModel.created_by))
-    
-    total = query.count()
-    scenes = query.order_by(SceneModel.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # 确保每个场景都有 created_by_id
-    for scene in scenes:
-        if scene.created_by_id is None and current_user:
-            scene.created_by_id = current_user.id
-            db.add(scene)
-    
-    if db.dirty:
-        db.commit()
+    total = count_cache.count(query)
+    scenes, next_cursor = paginate(
+        query, SceneModel, limit=limit, skip=skip, cursor=cursor, descending=True, keyset=not search
+    )
+    set_page_headers(response, next_cursor, total)
     
-    return {"items": scenes, "total": total}
+    return {"items": scenes, "total": total, "next_cursor": next_cursor}
 
 @router.post("/", response_model=Scene)
 def create_scene(
@@ -106,10 +99,11 @@ def update_scene(
     
     update_data = scene_in.dict(exclude_unset=True)
     
-    # 如果更新了拓扑数据，更新节点数量
+    # 如果更新了拓扑数据，更新节点数量与拓扑版本
     if "topology" in update_data:
         topology = update_data["topology"] or {"nodes": [], "edges": [], "groups": []}
         update_data["node_count"] = len(topology.get("nodes", []))
+        update_data["topology_version"] = (scene.topology_version or 0) + 1
     
     for field, value in update_data.items():
         setattr(scene, field, value)
@@ -119,6 +113,50 @@ def update_scene(
     db.refresh(scene)
     return scene
 
+@router.patch("/{scene_id}/topology", response_model=TopologyPatchResult)
+def patch_scene_topology(
+    *,
+    db: Session = Depends(deps.get_db),
+    scene_id: int,
+    patch: TopologyPatch,
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    以 JSON Patch（RFC 6902）增量更新场景拓扑
+    - version: 补丁所基于的拓扑版本，与当前版本不一致时返回 409，客户端需重新获取拓扑
+    - 成功后返回新的版本号与节点数
+    """
+    scene = db.query(SceneModel).filter(SceneModel.id == scene_id).first()
+    if not scene:
+        raise HTTPException(status_code=404, detail="场景不存在")
+    if scene.topology_version != patch.version:
+        raise HTTPException(status_code=409, detail=f"拓扑已被修改，当前版本为 {scene.topology_version}")
+
+    try:
+        topology = apply_patch(scene.topology or {"nodes": [], "edges": [], "groups": []}, patch.operations)
+    except JsonPatchError as e:
+        raise HTTPException(status_code=400, detail=f"无效的补丁：{str(e)}")
+    if not isinstance(topology, dict) or not isinstance(topology.get("nodes", []), list):
+        raise HTTPException(status_code=400, detail="无效的补丁：拓扑必须包含节点列表")
+    node_count = len(topology.get("nodes", []))
+
+    # 以版本号为条件更新，防止并发的补丁相互覆盖
+    version = patch.version + 1
+    updated = db.query(SceneModel).filter(
+        SceneModel.id == scene_id,
+        SceneModel.topology_version == patch.version
+    ).update({
+        "topology": topology,
+        "topology_version": version,
+        "node_count": node_count,
+        "updated_at": datetime.utcnow()
+    }, synchronize_session=False)
+    if not updated:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="拓扑已被修改，请重新获取后再提交")
+    db.commit()
+    return {"version": version, "node_count": node_count}
+
 @router.delete("/{scene_id}")
 def delete_scene(
     *,
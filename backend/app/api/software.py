@@ -1,10 +1,12 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response, Query
 from sqlalchemy.orm import Session
 from app.api import deps
 from app.schemas.software import Software, SoftwareCreate, SoftwareUpdate
 from app.models.software import Software as SoftwareModel
 from app.models.user import User
+from app.db.search import search_index
+from app.utils.pagination import paginate, count_cache, set_page_headers
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,32 +14,36 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Software])
 def list_software(
+    response: Response,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     search: Optional[str] = None,
     architecture: Optional[str] = None,
     current_user: User = Depends(deps.get_current_user),
 ):
     """
     获取软件列表
-    - search: 搜索关键词(名称或描述)
+    - search: 搜索关键词(名称或描述)，按相关度排序，支持前缀匹配
     - architecture: 架构筛选(x86/arm)
+    - cursor: 上一页响应头 X-Next-Cursor 返回的游标，按 (created_at, id) 继续翻页
+    - include_total: 在响应头 X-Total-Count 中返回总数（缓存的近似值）
     """
     query = db.query(SoftwareModel)
     
     # 搜索条件
     if search:
-        query = query.filter(
-            (SoftwareModel.name.ilike(f"%{search}%")) |
-            (SoftwareModel.description.ilike(f"%{search}%"))
-        )
+        query = search_index.apply(query, SoftwareModel, search)
     
     # 架构筛选
     if architecture:
         query = query.filter(SoftwareModel.architecture == architecture)
     
-    software = query.offset(skip).limit(limit).all()
+    # 分页：搜索结果按相关度排序，游标记录偏移量
+    software, next_cursor = paginate(query, SoftwareModel, limit=limit, skip=skip, cursor=cursor, keyset=not search)
+    set_page_headers(response, next_cursor, count_cache.count(query) if include_total else None)
     return software
 
 @router.post("/", response_model=Software)
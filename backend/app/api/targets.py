@@ -1,13 +1,17 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, Query
 from sqlalchemy.orm import Session
 from app.api import deps
 from app.schemas.target import Target, TargetCreate, TargetUpdate
 from app.models.target import Target as TargetModel
 from app.models.image import Image as ImageModel
 from app.models.software import Software as SoftwareModel
+from app.models.instance import Instance as InstanceModel
 from app.models.user import User
 from app.utils.dockerfile import generate_dockerfile
+from app.utils import build_logs
+from app.services.job_service import build_in_progress
+from app.utils.pagination import paginate, count_cache, set_page_headers
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,15 +19,22 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Target])
 def list_targets(
+    response: Response,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(deps.get_current_user),
 ):
     """
     获取靶标列表
+    - cursor: 上一页响应头 X-Next-Cursor 返回的游标，按 (created_at, id) 继续翻页
+    - include_total: 在响应头 X-Total-Count 中返回总数（缓存的近似值）
     """
-    targets = db.query(TargetModel).offset(skip).limit(limit).all()
+    query = db.query(TargetModel)
+    targets, next_cursor = paginate(query, TargetModel, limit=limit, skip=skip, cursor=cursor)
+    set_page_headers(response, next_cursor, count_cache.count(query) if include_total else None)
     return targets
 
 @router.post("/", response_model=Target)
@@ -94,6 +105,34 @@ def get_target(
         raise HTTPException(status_code=404, detail="Target not found")
     return target
 
+@router.get("/{target_id}/build-logs")
+def stream_target_build_logs(
+    *,
+    db: Session = Depends(deps.get_db),
+    target_id: int,
+    offset: int = 0,
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    以 SSE 流式获取靶标最近一次构建的日志
+    """
+    target = db.query(TargetModel).filter(TargetModel.id == target_id).first()
+    if not target:
+        raise HTTPException(status_code=404, detail="Target not found")
+    
+    instances = (
+        db.query(InstanceModel.id)
+        .filter(InstanceModel.target_id == target_id)
+        .order_by(InstanceModel.id.desc())
+        .all()
+    )
+    instance_id = next((i.id for i in instances if build_logs.exists(i.id)), None)
+    if instance_id is None:
+        raise HTTPException(status_code=404, detail="No build logs found")
+    
+    return build_logs.build_log_response(instance_id, offset, last_event_id, lambda: build_in_progress(instance_id))
+
 @router.put("/{target_id}", response_model=Target)
 def update_target(
     *,
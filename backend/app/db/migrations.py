@@ -0,0 +1,75 @@
+import logging
+from typing import Callable, List, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from app.models.base import Base
+
+logger = logging.getLogger(__name__)
+
+def create_missing_indexes(connection: Connection) -> None:
+    """
+    为已存在的表补建模型中新增的索引（create_all 只为新表建索引）
+    """
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=connection)
+                logger.info(f"Created index {index.name}")
+
+def backfill_scene_created_by(connection: Connection) -> None:
+    """
+    为缺少创建者的历史场景补上创建者（最早的管理员，没有管理员时为最早的用户）
+    """
+    result = connection.execute(text(
+        "UPDATE scenes SET created_by_id = ("
+        "SELECT id FROM users ORDER BY CASE WHEN role = 'admin' THEN 0 ELSE 1 END, id LIMIT 1"
+        ") WHERE created_by_id IS NULL"
+    ))
+    if result.rowcount:
+        logger.info(f"Backfilled created_by_id for {result.rowcount} scenes")
+
+def add_scene_topology_version(connection: Connection) -> None:
+    """
+    为已存在的 scenes 表添加 topology_version 列
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("scenes")}
+    if "topology_version" not in columns:
+        connection.execute(text("ALTER TABLE scenes ADD COLUMN topology_version INTEGER NOT NULL DEFAULT 0"))
+        logger.info("Added scenes.topology_version")
+
+def delete_orphaned_jobs(connection: Connection) -> None:
+    """
+    删除指向已删除实例的历史任务（早期删除实例时未清理任务）
+    """
+    if "jobs" not in inspect(connection).get_table_names():
+        return
+    result = connection.execute(text(
+        "DELETE FROM jobs WHERE instance_id IS NOT NULL "
+        "AND instance_id NOT IN (SELECT id FROM instances)"
+    ))
+    if result.rowcount:
+        logger.info(f"Deleted {result.rowcount} orphaned jobs")
+
+# 启动迁移：每一项都必须可重复执行，按顺序在 create_all 之后运行
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("create_missing_indexes", create_missing_indexes),
+    ("backfill_scene_created_by", backfill_scene_created_by),
+    ("add_scene_topology_version", add_scene_topology_version),
+    ("delete_orphaned_jobs", delete_orphaned_jobs),
+]
+
+def run_migrations(engine: Engine) -> None:
+    """
+    依次执行启动迁移，每一项单独提交，失败时记录日志并继续
+    """
+    for name, migration in MIGRATIONS:
+        try:
+            with engine.begin() as connection:
+                migration(connection)
+        except Exception as e:
+            logger.error(f"Migration {name} failed: {str(e)}", exc_info=True)
@@ -0,0 +1,146 @@
+import re
+import logging
+from typing import Dict, Optional, Tuple
+from sqlalchemy import Float, Integer, event, or_, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Query
+from app.models.base import Base
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "search_index"
+# 参与全文检索的表及字段
+SEARCHABLE: Dict[str, Tuple[str, ...]] = {
+    "images": ("name", "description"),
+    "softwares": ("name", "description"),
+    "scenes": ("name", "description"),
+}
+# bm25 列权重：kind、doc_id 不参与评分，名称匹配比描述更重要
+RANK_WEIGHTS = "0.0, 0.0, 10.0, 1.0"
+
+# 中日韩字符：unicode61 分词器会把连续的汉字当作一个词，索引与查询时逐字切分
+CJK_PATTERN = re.compile("([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])")
+
+def segment(value: Optional[str]) -> str:
+    """
+    在每个中日韩字符两侧加空格，使其成为独立的词
+    """
+    return " ".join(CJK_PATTERN.sub(r" \1 ", value or "").split())
+
+def build_match(term: str) -> Optional[str]:
+    """
+    将搜索词转换为 FTS5 MATCH 表达式：每个词作为短语并做前缀匹配，词之间为 AND；
+    汉字逐字切分后作为短语，要求相邻出现。没有可检索的词时返回 None
+    """
+    phrases = []
+    for word in re.findall(r"\w+", term or ""):
+        tokens = segment(word.replace("_", " "))
+        if tokens:
+            phrases.append(f'"{tokens}"*')
+    return " ".join(phrases) or None
+
+class SearchIndex:
+    """
+    基于 SQLite FTS5 的全文索引
+
+    一张 FTS5 表存放镜像、软件、场景的名称与描述，通过 ORM 事件在同一事务中同步；
+    启动时若索引条目数与源表不一致则重建。非 SQLite 或 FTS5 不可用时回退为 ilike 模糊匹配
+    """
+
+    def __init__(self):
+        self.available = False
+
+    def ensure(self, engine: Engine) -> None:
+        """
+        创建索引表，索引与源表不一致时重建
+        """
+        self.available = False
+        if engine.dialect.name != "sqlite":
+            return
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                    f"USING fts5(kind UNINDEXED, doc_id UNINDEXED, name, description, tokenize='unicode61')"
+                ))
+                indexed = connection.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE}")).scalar()
+                total = sum(
+                    connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+                    for table in SEARCHABLE
+                )
+                if indexed != total:
+                    self.rebuild(connection)
+            self.available = True
+        except Exception as e:
+            logger.error(f"Error creating search index, falling back to LIKE search: {str(e)}", exc_info=True)
+
+    def rebuild(self, connection: Connection) -> None:
+        """
+        清空并重新写入全部索引
+        """
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+        for table, fields in SEARCHABLE.items():
+            rows = connection.execute(text(f"SELECT id, {', '.join(fields)} FROM {table}")).mappings()
+            for row in rows:
+                self._insert(connection, table, row["id"], row)
+        logger.info("Search index rebuilt")
+
+    def _insert(self, connection: Connection, table: str, doc_id: int, values) -> None:
+        connection.execute(
+            text(f"INSERT INTO {SEARCH_TABLE} (kind, doc_id, name, description) VALUES (:kind, :doc_id, :name, :description)"),
+            {
+                "kind": table,
+                "doc_id": doc_id,
+                "name": segment(values["name"]),
+                "description": segment(values["description"]),
+            }
+        )
+
+    def _delete(self, connection: Connection, table: str, doc_id: int) -> None:
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE kind = :kind AND doc_id = :doc_id"),
+            {"kind": table, "doc_id": doc_id}
+        )
+
+    def sync(self, connection: Connection, target, deleted: bool = False) -> None:
+        """
+        ORM 事件回调：在触发 flush 的连接（同一事务）中更新索引
+        """
+        table = getattr(target, "__tablename__", None)
+        if not self.available or table not in SEARCHABLE or connection.dialect.name != "sqlite":
+            return
+        self._delete(connection, table, target.id)
+        if not deleted:
+            self._insert(connection, table, target.id, {field: getattr(target, field) for field in SEARCHABLE[table]})
+
+    def apply(self, query: Query, model, term: str) -> Query:
+        """
+        为查询添加搜索条件：索引可用时按相关度排序（后续 order_by 作为次要排序），
+        否则在名称与描述上做 ilike 模糊匹配
+        """
+        table = model.__tablename__
+        if not self.available or query.session.get_bind().dialect.name != "sqlite":
+            return query.filter(or_(*(getattr(model, field).ilike(f"%{term}%") for field in SEARCHABLE[table])))
+
+        match = build_match(term)
+        if not match:
+            return query
+        ranked = text(
+            f"SELECT CAST(doc_id AS INTEGER) AS doc_id, bm25({SEARCH_TABLE}, {RANK_WEIGHTS}) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match AND kind = :kind"
+        ).bindparams(match=match, kind=table).columns(doc_id=Integer, rank=Float).subquery("ranked")
+        return query.join(ranked, ranked.c.doc_id == model.id).order_by(ranked.c.rank)
+
+search_index = SearchIndex()
+
+@event.listens_for(Base, "after_insert", propagate=True)
+def _index_after_insert(mapper, connection, target):
+    search_index.sync(connection, target)
+
+@event.listens_for(Base, "after_update", propagate=True)
+def _index_after_update(mapper, connection, target):
+    search_index.sync(connection, target)
+
+@event.listens_for(Base, "after_delete", propagate=True)
+def _index_after_delete(mapper, connection, target):
+    search_index.sync(connection, target, deleted=True)
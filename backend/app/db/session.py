@@ -1,10 +1,52 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-# SQLite连接时增加检查同步配置
-engine = create_engine(
-    settings.SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) 
\ No newline at end of file
+def _create_sqlite_engine(url) -> Engine:
+    """
+    SQLite：允许跨线程使用连接，每个新连接设置 WAL、同步级别、mmap 与忙等待超时，
+    后台任务与请求同时写入时等待锁释放而不是立即报 database is locked
+    """
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT / 1000}
+    )
+    in_memory = url.database in (None, "", ":memory:")
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if settings.SQLITE_WAL and not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.close()
+
+    return engine
+
+def _create_pooled_engine(url) -> Engine:
+    """
+    PostgreSQL 等服务端数据库：连接池大小、溢出与回收时间可配置，取出连接前检查是否可用
+    """
+    return create_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
+
+def create_db_engine(database_url: str) -> Engine:
+    """
+    根据数据库地址创建引擎
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        return _create_sqlite_engine(url)
+    return _create_pooled_engine(url)
+
+engine = create_db_engine(settings.SQLALCHEMY_DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -5,6 +5,8 @@ from app.models.image import Image
 from app.models.software import Software
 from app.models.target import Target
 from app.models.instance import Instance
+from app.models.job import Job
+from app.models.ai_cache import AICacheEntry
 
 # 确保所有模型都被导入
 __all__ = [
@@ -14,5 +16,7 @@ __all__ = [
     "Image",
     "Software",
     "Target",
-    "Instance"
+    "Instance",
+    "Job",
+    "AICacheEntry"
 ] 
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from app.models.user import Base
+
+class AICacheEntry(Base):
+    __tablename__ = "ai_cache"
+
+    key = Column(String(64), primary_key=True)  # 提示词版本、模型与规范化输入的 SHA-256
+    kind = Column(String(50), nullable=False, index=True)  # description, dockerfile_optimization, compatibility_check
+    model = Column(String(100), nullable=False)
+    response = Column(Text, nullable=False)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)  # LRU 淘汰依据
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.user import Base
 
 class Instance(Base):
     __tablename__ = "instances"
+    __table_args__ = (
+        Index("ix_instances_created_at_id", "created_at", "id"),  # 键集分页
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON
+from datetime import datetime
+from app.models.user import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(20), nullable=False, index=True)  # build, start
+    instance_id = Column(Integer, ForeignKey("instances.id"), index=True)
+    status = Column(String(20), default="pending", index=True)  # pending, running, succeeded, failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    payload = Column(JSON, nullable=True)  # 任务参数
+    result = Column(JSON, nullable=True)  # 任务结果（如构建元数据）
+    error = Column(Text, nullable=True)
+    worker_id = Column(String(100), nullable=True)  # 当前持有任务的工作进程
+    run_after = Column(DateTime, default=datetime.utcnow)  # 重试退避：此时间之前不会被领取
+    heartbeat_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
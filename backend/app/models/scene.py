@@ -1,19 +1,24 @@
 from datetime import datetime
 from typing import List, Optional, Tuple, Dict, Any
-from sqlalchemy import Column, Integer, String, Text, DateTime, or_, ForeignKey, JSON
-from sqlalchemy.orm import Session, relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.orm import Query, Session, relationship, load_only, noload
 from sqlalchemy.sql import func
 from app.models.base import Base
+from app.db.search import search_index
 from app.schemas.scene import SceneCreate, SceneUpdate
 
 class Scene(Base):
     __tablename__ = "scenes"
+    __table_args__ = (
+        Index("ix_scenes_created_at_id", "created_at", "id"),  # 键集分页
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), index=True)
     description = Column(Text, nullable=True)
     node_count = Column(Integer, default=0)
     topology = Column(JSON, nullable=True)  # 存储拓扑数据
+    topology_version = Column(Integer, default=0, server_default="0", nullable=False)  # 拓扑版本号，用于增量更新的乐观并发控制
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     created_by_id = Column(Integer, ForeignKey("users.id"))
@@ -24,6 +29,19 @@ class Scene(Base):
     def get(cls, db: Session, id: int) -> Optional["Scene"]:
         return db.query(cls).filter(cls.id == id).first()
 
+    @classmethod
+    def summary_query(cls, db: Session) -> Query:
+        """
+        列表用的查询：只读取摘要字段，不加载拓扑 JSON 与创建者
+        """
+        return db.query(cls).options(
+            load_only(
+                cls.id, cls.name, cls.description, cls.node_count,
+                cls.created_at, cls.updated_at, cls.created_by_id
+            ),
+            noload(cls.created_by)
+        )
+
     @classmethod
     def get_multi(
         cls,
@@ -33,15 +51,10 @@ class Scene(Base):
         limit: int = 10,
         keyword: Optional[str] = None
     ) -> Tuple[List["Scene"], int]:
-        query = db.query(cls)
+        query = cls.summary_query(db)
         
         if keyword:
-            query = query.filter(
-                or_(
-                    cls.name.ilike(f"%{keyword}%"),
-                    cls.description.ilike(f"%{keyword}%")
-                )
-            )
+            query = search_index.apply(query, cls, keyword)
         
         total = query.count()
         scenes = query.order_by(cls.created_at.desc()).offset(skip).limit(limit).all()
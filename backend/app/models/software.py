@@ -1,6 +1,6 @@
 from typing import List, Optional
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, TypeDecorator
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, TypeDecorator, Index
 from sqlalchemy.orm import Session, relationship
 from sqlalchemy.sql import func
 from app.models.base import Base
@@ -22,6 +22,9 @@ class JSONEncodedList(TypeDecorator):
 
 class Software(Base):
     __tablename__ = "softwares"
+    __table_args__ = (
+        Index("ix_softwares_created_at_id", "created_at", "id"),  # 键集分页
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Table
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Table, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.user import Base
@@ -13,6 +13,9 @@ target_software = Table(
 
 class Target(Base):
     __tablename__ = "targets"
+    __table_args__ = (
+        Index("ix_targets_created_at_id", "created_at", "id"),  # 键集分页
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
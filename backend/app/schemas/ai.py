@@ -4,6 +4,8 @@ from typing import List
 class CompatibilityCheckRequest(BaseModel):
     base_image_id: int
     software_ids: List[int]
+    deep: bool = False
+    bypass_cache: bool = False
 
 class GenerateResponse(BaseModel):
     result: str 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class Activity(BaseModel):
     id: int
@@ -14,6 +14,27 @@ class ResourceUsage(BaseModel):
     cpuUsage: float
     memoryUsage: float
     diskUsage: float
+    load1: float = 0.0
+    load5: float = 0.0
+    load15: float = 0.0
+
+    class Config:
+        allow_population_by_field_name = True
+
+class ResourceHistory(BaseModel):
+    timestamps: List[float]
+    cpuUsage: List[float]
+    memoryUsage: List[float]
+    diskUsage: List[float]
+    load1: List[float]
+
+    class Config:
+        allow_population_by_field_name = True
+
+class ContainerUsage(BaseModel):
+    containers: int
+    cpuPercent: float
+    memoryUsage: int
 
     class Config:
         allow_population_by_field_name = True
@@ -25,6 +46,8 @@ class DashboardStats(BaseModel):
     totalSoftware: int
     recentActivities: List[Activity]
     resourceUsage: ResourceUsage
+    containerUsage: Optional[ContainerUsage] = None  # 平台容器资源汇总（来自后台采集器）
+    resourceHistory: Optional[ResourceHistory] = None  # 请求 history 时返回的主机资源序列
 
     class Config:
         allow_population_by_field_name = True 
\ No newline at end of file
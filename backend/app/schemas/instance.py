@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Any
 from .target import Target
 
 class InstanceBase(BaseModel):
@@ -25,4 +25,13 @@ class Instance(InstanceBase):
     target: Target
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True 
+
+class ContainerState(BaseModel):
+    state: str  # Docker 容器状态: running, exited, ...
+    status: str  # 例如: "Up 5 minutes"
+    image: Optional[str] = None
+    ports: List[Dict[str, Any]] = []
+
+class InstanceWithState(Instance):
+    live: Optional[ContainerState] = None  # 容器实时状态，容器不存在时为空
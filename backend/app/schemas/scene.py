@@ -18,6 +18,7 @@ class Scene(SceneBase):
     id: int
     node_count: int
     topology: Optional[Dict[str, Any]] = None
+    topology_version: int = 0
     created_at: datetime
     updated_at: datetime
     created_by_id: int
@@ -46,9 +47,33 @@ class Scene(SceneBase):
             }
         }
 
+class TopologyPatch(BaseModel):
+    version: int  # 补丁所基于的拓扑版本
+    operations: List[Dict[str, Any]]  # RFC 6902 JSON Patch 操作
+
+class TopologyPatchResult(BaseModel):
+    version: int
+    node_count: int
+
 class SceneInDB(Scene):
     pass
 
+class SceneSummary(BaseModel):
+    """
+    场景列表项，不包含拓扑数据
+    """
+    id: int
+    name: str
+    description: Optional[str] = None
+    node_count: int
+    created_at: datetime
+    updated_at: datetime
+    created_by_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
 class SceneList(BaseModel):
-    items: List[Scene]
-    total: int 
\ No newline at end of file
+    items: List[SceneSummary]
+    total: int
+    next_cursor: Optional[str] = None  # 下一页游标，没有更多数据时为空 
\ No newline at end of file
@@ -0,0 +1,133 @@
+import json
+import hashlib
+import threading
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.ai_cache import AICacheEntry
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """
+    统一换行符并去除行尾空白，使仅有空白差异的输入命中同一缓存
+    """
+    lines = (text or "").replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+def normalize_items(items: list) -> list:
+    """
+    软件列表等与顺序无关的输入按内容排序
+    """
+    return sorted(items, key=lambda item: json.dumps(item, sort_keys=True, ensure_ascii=False, default=str))
+
+def make_key(kind: str, version: int, model: str, inputs: Dict[str, Any]) -> str:
+    """
+    缓存键：提示词模板版本、模型与规范化输入的 SHA-256
+    """
+    payload = json.dumps(
+        {"kind": kind, "version": version, "model": model, "inputs": inputs},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class AIResponseCache:
+    """
+    基于 SQLite 的 AI 响应缓存
+
+    条目超过 AI_CACHE_TTL 后失效，总数超过 AI_CACHE_MAX_ENTRIES 时淘汰最久未访问的条目。
+    命中/未命中次数按类型在进程内计数。
+    """
+
+    def __init__(self):
+        self._hits: Dict[str, int] = defaultdict(int)
+        self._misses: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, key: str, kind: str) -> Optional[str]:
+        if not settings.AI_CACHE_ENABLED:
+            return None
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            entry = db.query(AICacheEntry).filter(AICacheEntry.key == key).first()
+            if entry is None or entry.expires_at <= now:
+                with self._lock:
+                    self._misses[kind] += 1
+                return None
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_accessed_at = now
+            db.commit()
+            with self._lock:
+                self._hits[kind] += 1
+            return entry.response
+        except Exception as e:
+            logger.error(f"Error reading AI cache: {str(e)}", exc_info=True)
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def put(self, key: str, kind: str, model: str, response: str) -> None:
+        if not settings.AI_CACHE_ENABLED:
+            return
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            entry = db.query(AICacheEntry).filter(AICacheEntry.key == key).first()
+            if entry is None:
+                entry = AICacheEntry(key=key, kind=kind, model=model, hits=0)
+                db.add(entry)
+            entry.response = response
+            entry.created_at = now
+            entry.last_accessed_at = now
+            entry.expires_at = now + timedelta(seconds=settings.AI_CACHE_TTL)
+            db.flush()
+            self._evict(db, now)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error writing AI cache: {str(e)}", exc_info=True)
+            db.rollback()
+        finally:
+            db.close()
+
+    def _evict(self, db, now: datetime) -> None:
+        """
+        删除过期条目，并按最近访问时间淘汰超出上限的条目
+        """
+        db.query(AICacheEntry).filter(AICacheEntry.expires_at <= now).delete(synchronize_session=False)
+        overflow = db.query(AICacheEntry).count() - settings.AI_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            stale = [
+                row.key for row in
+                db.query(AICacheEntry.key).order_by(AICacheEntry.last_accessed_at).limit(overflow).all()
+            ]
+            db.query(AICacheEntry).filter(AICacheEntry.key.in_(stale)).delete(synchronize_session=False)
+
+    def stats(self) -> dict:
+        db = SessionLocal()
+        try:
+            entries = db.query(AICacheEntry).count()
+        finally:
+            db.close()
+        with self._lock:
+            kinds = set(self._hits) | set(self._misses)
+            by_kind = {kind: {"hits": self._hits[kind], "misses": self._misses[kind]} for kind in kinds}
+        hits = sum(item["hits"] for item in by_kind.values())
+        misses = sum(item["misses"] for item in by_kind.values())
+        return {
+            "enabled": settings.AI_CACHE_ENABLED,
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "by_kind": by_kind
+        }
+
+ai_cache = AIResponseCache()
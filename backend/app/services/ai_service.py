@@ -1,71 +1,279 @@
-import openai
 from app.core.config import settings
 import json
-from typing import List, Dict, Any
+import hashlib
+import logging
+from typing import List, Dict, Any, AsyncIterator, Optional
+from starlette.concurrency import run_in_threadpool
 from .prompt_service import PromptService
+from .ai_cache import ai_cache, make_key, normalize_text, normalize_items
+from .llm_client import llm_client
+from app.utils.single_flight import SingleFlight
 
-# 配置 OpenAI 客户端
-openai.api_key = settings.BAILIAN_API_KEY  # 通义千问的 API key
-openai.api_base = settings.API_BASE_URL
-openai.timeout = 30  # 设置超时时间为 30 秒
+logger = logging.getLogger(__name__)
 
-async def _call_ai_api(prompt: str, max_tokens: int = 500) -> str:
+SYSTEM_PROMPT = "你是一个专业的容器化环境专家。"
+FAILED_MESSAGE = "抱歉，生成内容失败。请稍后重试。"
+ERROR_MESSAGE = "抱歉，调用 AI 服务时发生错误。请稍后重试。"
+
+# 相同提示词的并发请求共享一次上游调用
+_flights = SingleFlight()
+
+class AIResponseError(Exception):
+    """
+    AI API 未返回有效内容
+    """
+
+class MarkdownFenceStripper:
+    """
+    增量移除 Markdown 代码块标记（```dockerfile、```）及首尾空白
+
+    可能构成标记前缀的内容与末尾空白暂存，等待后续数据确定后再输出。
+    """
+
+    MARKERS = ("```dockerfile\n", "```\n")
+
+    def __init__(self):
+        self._pending = ""
+        self._whitespace = ""
+        self._started = False
+
+    def _emit(self, text: str) -> str:
+        # 去除开头空白；末尾空白暂存，后面出现非空白内容时再输出
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        text = self._whitespace + text
+        stripped = text.rstrip()
+        self._whitespace = text[len(stripped):]
+        return stripped
+
+    def feed(self, chunk: str) -> str:
+        buffer = self._pending + chunk
+        output = []
+        while True:
+            index = buffer.find("`")
+            if index < 0:
+                output.append(buffer)
+                buffer = ""
+                break
+            output.append(buffer[:index])
+            buffer = buffer[index:]
+            marker = next((m for m in self.MARKERS if buffer.startswith(m)), None)
+            if marker:
+                buffer = buffer[len(marker):]
+            elif any(m.startswith(buffer) for m in self.MARKERS):
+                break  # 可能是未接收完整的标记
+            elif buffer.startswith("```"):
+                buffer = buffer[3:]
+            else:
+                output.append("`")
+                buffer = buffer[1:]
+        self._pending = buffer
+        return self._emit("".join(output))
+
+    def flush(self) -> str:
+        pending, self._pending = self._pending.replace("```", ""), ""
+        return self._emit(pending)
+
+def strip_markdown_fences(text: str) -> str:
+    stripper = MarkdownFenceStripper()
+    return stripper.feed(text) + stripper.flush()
+
+def _messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+def _cache_key(cache_kind: Optional[str], cache_inputs: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not cache_kind:
+        return None
+    return make_key(cache_kind, PromptService.VERSION, settings.AI_MODEL, cache_inputs or {})
+
+def _flight_key(cache_key: Optional[str], prompt: str, max_tokens: int) -> str:
+    """
+    合并请求的键：有缓存键时使用缓存键（即规范化后的输入），否则使用提示词本身
+    """
+    if cache_key:
+        return cache_key
+    return hashlib.sha256(f"{settings.AI_MODEL}\0{max_tokens}\0{prompt}".encode("utf-8")).hexdigest()
+
+async def _complete(prompt: str, max_tokens: int) -> str:
+    """
+    调用 AI API，失败时抛出异常（错误信息不会被写入缓存）
+    """
+    content = await llm_client.chat(_messages(prompt), max_tokens=max_tokens)
+    if not content:
+        raise AIResponseError("Empty response from AI API")
+    return content
+
+async def _complete_and_cache(prompt: str, max_tokens: int, key: Optional[str], cache_kind: Optional[str]) -> str:
+    content = await _complete(prompt, max_tokens)
+    if key:
+        await run_in_threadpool(ai_cache.put, key, cache_kind, settings.AI_MODEL, content)
+    return content
+
+async def _call_ai_api(
+    prompt: str,
+    max_tokens: int = 500,
+    cache_kind: Optional[str] = None,
+    cache_inputs: Optional[Dict[str, Any]] = None,
+    bypass_cache: bool = False
+) -> str:
     """
     调用 AI API 的通用方法
+
+    指定 cache_kind 时按提示词版本、模型与规范化输入缓存成功的响应；
+    bypass_cache 跳过缓存读取，但仍用新结果刷新缓存。
+    相同输入的并发调用只发出一次上游请求
     """
+    key = _cache_key(cache_kind, cache_inputs)
+    if key and not bypass_cache:
+        cached = await run_in_threadpool(ai_cache.get, key, cache_kind)
+        if cached is not None:
+            return cached
+    
     try:
-        response = openai.ChatCompletion.create(
-            model="qwen-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "你是一个专业的容器化环境专家。"
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=max_tokens,
-            top_p=0.95,
-            stream=False,
-            request_timeout=30
+        return await _flights.do(
+            _flight_key(key, prompt, max_tokens),
+            lambda: _complete_and_cache(prompt, max_tokens, key, cache_kind)
         )
-        
-        if isinstance(response, dict) and 'choices' in response:
-            choice = response['choices'][0]
-            if 'message' in choice:
-                return choice['message'].get('content', '').strip()
-            elif 'text' in choice:
-                return choice['text'].strip()
-        
-        return "抱歉，生成内容失败。请稍后重试。"
+    except AIResponseError:
+        return FAILED_MESSAGE
     except Exception as e:
-        print(f"Error calling AI API: {str(e)}")
-        return "抱歉，调用 AI 服务时发生错误。请稍后重试。"
+        logger.error(f"Error calling AI API: {str(e)}")
+        return ERROR_MESSAGE
+
+async def _generate_and_cache(
+    prompt: str,
+    max_tokens: int,
+    key: Optional[str],
+    cache_kind: Optional[str]
+) -> AsyncIterator[str]:
+    """
+    上游流：逐段产出生成的文本，完整生成后写入缓存（中途取消的结果不会被缓存）
+    """
+    parts = []
+    async for delta in llm_client.stream_chat(_messages(prompt), max_tokens=max_tokens):
+        parts.append(delta)
+        yield delta
+    
+    content = "".join(parts).strip()
+    if not content:
+        raise AIResponseError("Empty response from AI API")
+    if key:
+        await run_in_threadpool(ai_cache.put, key, cache_kind, settings.AI_MODEL, content)
+
+async def _stream_ai_api(
+    prompt: str,
+    max_tokens: int = 500,
+    cache_kind: Optional[str] = None,
+    cache_inputs: Optional[Dict[str, Any]] = None,
+    bypass_cache: bool = False
+) -> AsyncIterator[str]:
+    """
+    流式调用 AI API，逐段产出生成的文本，失败时抛出异常
+
+    缓存命中时一次性产出缓存内容；相同输入的并发请求订阅同一个上游流，收到相同的片段
+    """
+    key = _cache_key(cache_kind, cache_inputs)
+    if key and not bypass_cache:
+        cached = await run_in_threadpool(ai_cache.get, key, cache_kind)
+        if cached is not None:
+            yield cached
+            return
+    
+    chunks = _flights.stream(
+        _flight_key(key, prompt, max_tokens),
+        lambda: _generate_and_cache(prompt, max_tokens, key, cache_kind)
+    )
+    try:
+        async for delta in chunks:
+            yield delta
+    finally:
+        await chunks.aclose()
 
-async def generate_description(image: Dict[str, Any], software_list: List[Dict[str, Any]]) -> str:
+async def generate_description(
+    image: Dict[str, Any],
+    software_list: List[Dict[str, Any]],
+    bypass_cache: bool = False
+) -> str:
     """
     生成环境描述
     """
     prompt = PromptService.get_description_prompt(image, software_list)
-    return await _call_ai_api(prompt, max_tokens=150)
+    return await _call_ai_api(
+        prompt,
+        max_tokens=150,
+        cache_kind="description",
+        cache_inputs={"image": image, "software": normalize_items(software_list)},
+        bypass_cache=bypass_cache
+    )
 
-async def optimize_dockerfile(dockerfile: str) -> str:
+def _optimize_dockerfile_args(dockerfile: str, bypass_cache: bool) -> dict:
+    return {
+        "prompt": PromptService.get_dockerfile_optimization_prompt(dockerfile),
+        "max_tokens": 1000,
+        "cache_kind": "dockerfile_optimization",
+        "cache_inputs": {"dockerfile": normalize_text(dockerfile)},
+        "bypass_cache": bypass_cache
+    }
+
+async def optimize_dockerfile(dockerfile: str, bypass_cache: bool = False) -> str:
     """
     优化 Dockerfile
     """
-    prompt = PromptService.get_dockerfile_optimization_prompt(dockerfile)
-    response = await _call_ai_api(prompt, max_tokens=1000)
+    response = await _call_ai_api(**_optimize_dockerfile_args(dockerfile, bypass_cache))
     
     # 移除可能存在的 Markdown 代码块标记
-    cleaned_response = response.replace('```dockerfile\n', '').replace('```\n', '').replace('```', '').strip()
-    return cleaned_response
+    return strip_markdown_fences(response)
 
-async def check_software_compatibility(base_image: Dict[str, Any], software_list: List[Dict[str, Any]]) -> str:
+async def optimize_dockerfile_stream(dockerfile: str, bypass_cache: bool = False) -> AsyncIterator[str]:
+    """
+    流式优化 Dockerfile，代码块标记在输出过程中增量移除
+    """
+    stripper = MarkdownFenceStripper()
+    async for delta in _stream_ai_api(**_optimize_dockerfile_args(dockerfile, bypass_cache)):
+        text = stripper.feed(delta)
+        if text:
+            yield text
+    text = stripper.flush()
+    if text:
+        yield text
+
+def _compatibility_args(base_image: Dict[str, Any], software_list: List[Dict[str, Any]], bypass_cache: bool) -> dict:
+    return {
+        "prompt": PromptService.get_compatibility_check_prompt(base_image, software_list),
+        "max_tokens": 500,
+        "cache_kind": "compatibility_check",
+        "cache_inputs": {"base_image": base_image, "software": normalize_items(software_list)},
+        "bypass_cache": bypass_cache
+    }
+
+async def check_software_compatibility(
+    base_image: Dict[str, Any],
+    software_list: List[Dict[str, Any]],
+    bypass_cache: bool = False
+) -> str:
     """
     检查软件兼容性
     """
-    prompt = PromptService.get_compatibility_check_prompt(base_image, software_list)
-    return await _call_ai_api(prompt, max_tokens=500) 
\ No newline at end of file
+    return await _call_ai_api(**_compatibility_args(base_image, software_list, bypass_cache))
+
+def check_software_compatibility_stream(
+    base_image: Dict[str, Any],
+    software_list: List[Dict[str, Any]],
+    bypass_cache: bool = False
+) -> AsyncIterator[str]:
+    """
+    流式检查软件兼容性
+    """
+    return _stream_ai_api(**_compatibility_args(base_image, software_list, bypass_cache))
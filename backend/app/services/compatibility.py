@@ -0,0 +1,232 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# 架构别名归一化为 Docker 平台名称；32 位与 64 位架构互不兼容
+# 界面上的 x86/arm 两个选项分别指 64 位的 amd64/arm64
+ARCH_ALIASES = {
+    "amd64": "amd64", "x86_64": "amd64", "x86-64": "amd64", "x64": "amd64", "x86": "amd64",
+    "386": "386", "i386": "386", "i686": "386",
+    "arm64": "arm64", "arm64/v8": "arm64", "aarch64": "arm64", "arm": "arm64",
+    "arm/v7": "arm/v7", "armv7": "arm/v7", "armv7l": "arm/v7", "armhf": "arm/v7",
+}
+# 与任意架构兼容的取值
+ANY_ARCH = {"any", "all", "noarch", "multi", "multiarch"}
+
+# 发行版家族，以及镜像名/标签中可识别的发行版或代号
+OS_FAMILIES = {
+    "debian": ("debian", "ubuntu", "kali", "slim", "bullseye", "bookworm", "buster", "stretch",
+               "trixie", "jammy", "focal", "bionic", "noble", "xenial"),
+    "rhel": ("centos", "rhel", "redhat", "rocky", "rockylinux", "almalinux", "fedora", "oraclelinux",
+             "amazonlinux", "ubi", "ubi8", "ubi9", "openeuler", "anolis"),
+    "alpine": ("alpine",),
+    "suse": ("opensuse", "sles", "suse", "leap", "tumbleweed"),
+    "arch": ("archlinux", "arch"),
+    "windows": ("windows", "nanoserver", "servercore", "windowsservercore"),
+}
+# 软件 os_type 中表示“任意 Linux”的取值
+GENERIC_OS = {"linux", "any", "all", "unix", "posix"}
+
+# 包管理器命令对应的发行版家族
+PACKAGE_MANAGERS = {
+    "apt-get": "debian", "apt": "debian", "dpkg": "debian",
+    "yum": "rhel", "dnf": "rhel", "rpm": "rhel", "microdnf": "rhel",
+    "apk": "alpine",
+    "zypper": "suse",
+    "pacman": "arch",
+}
+# 按 &&、||、;、|、换行与括号拆分出的每条命令，去掉前导的 sudo/env 及变量赋值后，首个词为命令名
+COMMAND_SEPARATOR = re.compile(r"&&|\|\||[;|\n()]")
+COMMAND_PREFIXES = {"sudo", "env", "exec", "command", "nohup", "time"}
+
+def normalize_arch(value: Optional[str]) -> Optional[str]:
+    """
+    归一化架构名称，无法识别时返回 None；"any" 等表示任意架构
+    """
+    value = (value or "").strip().lower()
+    if value in ANY_ARCH:
+        return "any"
+    if value.startswith("linux/"):
+        value = value[len("linux/"):]
+    return ARCH_ALIASES.get(value)
+
+def _os_tokens(text: str) -> List[str]:
+    return [token for token in re.split(r"[^a-z0-9]+", (text or "").lower()) if token]
+
+def infer_os_family(name: Optional[str], registry_path: Optional[str] = None) -> Optional[str]:
+    """
+    由镜像名称与仓库地址推断发行版家族（忽略仓库域名），无法推断时返回 None
+    """
+    path = registry_path or ""
+    host, _, rest = path.partition("/")
+    if rest and ("." in host or ":" in host or host == "localhost"):
+        path = rest
+    tokens = _os_tokens(path) + _os_tokens(name)
+    for token in tokens:
+        for family, markers in OS_FAMILIES.items():
+            if token in markers:
+                return family
+    return None
+
+def software_os_family(os_type: Optional[str]) -> Optional[str]:
+    """
+    软件 os_type 对应的发行版家族；"linux" 等通用取值返回 "linux"，无法识别时返回 None
+    """
+    value = (os_type or "").strip().lower()
+    if value in GENERIC_OS:
+        return "linux"
+    for family, markers in OS_FAMILIES.items():
+        if value == family or value in markers:
+            return family
+    return None
+
+def package_managers(install_command: Optional[str]) -> List[str]:
+    """
+    安装命令中作为命令执行的包管理器（按出现顺序去重），作为参数出现的包名（如 apt-get install rpm）不计入
+    """
+    found = []
+    for command in COMMAND_SEPARATOR.split(install_command or ""):
+        words = command.split()
+        while words and (
+            words[0] in COMMAND_PREFIXES
+            or words[0].startswith("-")
+            or re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", words[0])
+        ):
+            words.pop(0)
+        name = words[0].rsplit("/", 1)[-1] if words else None
+        if name in PACKAGE_MANAGERS and name not in found:
+            found.append(name)
+    return found
+
+def normalize_port(value: Any) -> Optional[Tuple[int, str]]:
+    """
+    将 80、"80"、"80/tcp" 等写法归一化为 (端口, 协议)，协议默认为 tcp；无法识别时返回 None
+    """
+    port, _, protocol = str(value).strip().lower().partition("/")
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        return None
+    return int(port), protocol or "tcp"
+
+def _get(obj: Any, field: str, default=None):
+    if isinstance(obj, dict):
+        return obj.get(field, default)
+    return getattr(obj, field, default)
+
+def _label(software: Any) -> str:
+    return f"{_get(software, 'name')} {_get(software, 'version') or ''}".strip()
+
+def check_compatibility(image: Any, software_list: List[Any]) -> dict:
+    """
+    本地规则检查基础镜像与软件列表的兼容性（image/software 可为模型对象或字典）
+
+    检查项：架构是否匹配、软件 os_type 与镜像发行版是否一致、安装命令的包管理器是否适用于镜像、
+    软件之间的端口冲突与同名软件的版本冲突。
+    返回 {"compatible", "resolved", "findings", "unresolved"}：
+    存在 error 级问题时 compatible 为 False；所有检查项都能确定结论时 resolved 为 True，
+    否则 unresolved 列出无法在本地判定的原因
+    """
+    findings: List[dict] = []
+    unresolved: List[str] = []
+
+    def finding(rule: str, severity: str, message: str, software: List[Any]) -> None:
+        findings.append({
+            "rule": rule,
+            "severity": severity,
+            "message": message,
+            "software_ids": [_get(s, "id") for s in software],
+        })
+
+    image_arch = normalize_arch(_get(image, "architecture"))
+    if image_arch is None:
+        unresolved.append(f"无法识别基础镜像架构：{_get(image, 'architecture')}")
+    family = infer_os_family(_get(image, "name"), _get(image, "registry_path"))
+    if family is None:
+        unresolved.append(f"无法从镜像名称推断操作系统：{_get(image, 'name')}")
+
+    for software in software_list:
+        label = _label(software)
+
+        arch = normalize_arch(_get(software, "architecture"))
+        if arch is None:
+            unresolved.append(f"无法识别 {label} 的架构：{_get(software, 'architecture')}")
+        elif image_arch and "any" not in (arch, image_arch) and arch != image_arch:
+            finding(
+                "architecture", "error",
+                f"{label} 的架构（{_get(software, 'architecture')}）与基础镜像（{_get(image, 'architecture')}）不一致",
+                [software]
+            )
+
+        os_family = software_os_family(_get(software, "os_type"))
+        if os_family is None:
+            unresolved.append(f"无法识别 {label} 的操作系统类型：{_get(software, 'os_type')}")
+        elif family and os_family == "linux" and family == "windows":
+            finding("os_type", "error", f"{label} 需要 Linux，基础镜像为 Windows", [software])
+        elif family and os_family != "linux" and os_family != family:
+            finding(
+                "os_type", "error",
+                f"{label} 适用于 {_get(software, 'os_type')}，与基础镜像的发行版（{family}）不一致",
+                [software]
+            )
+
+        if family:
+            managers = package_managers(_get(software, "install_command"))
+            mismatched = next((m for m in managers if PACKAGE_MANAGERS[m] != family), None)
+            if mismatched:
+                finding(
+                    "package_manager", "error",
+                    f"{label} 的安装命令使用 {mismatched}，基础镜像（{family}）不提供该包管理器",
+                    [software]
+                )
+
+    by_port: Dict[Tuple[int, str], List[Any]] = defaultdict(list)
+    for software in software_list:
+        for value in _get(software, "ports") or []:
+            port = normalize_port(value)
+            if port is None:
+                unresolved.append(f"无法识别 {_label(software)} 的端口：{value}")
+            elif software not in by_port[port]:
+                by_port[port].append(software)
+    for (port, protocol), owners in sorted(by_port.items()):
+        if len(owners) > 1:
+            name = str(port) if protocol == "tcp" else f"{port}/{protocol}"
+            finding(
+                "port_conflict", "error",
+                f"端口 {name} 被多个软件使用：{'、'.join(_label(s) for s in owners)}",
+                owners
+            )
+
+    by_name: Dict[str, List[Any]] = defaultdict(list)
+    for software in software_list:
+        by_name[(_get(software, "name") or "").strip().lower()].append(software)
+    for owners in by_name.values():
+        versions = {_get(s, "version") for s in owners}
+        if len(owners) > 1 and len(versions) > 1:
+            finding(
+                "duplicate_software", "warning",
+                f"同一软件存在多个版本：{'、'.join(_label(s) for s in owners)}",
+                owners
+            )
+
+    return {
+        "compatible": not any(f["severity"] == "error" for f in findings),
+        "resolved": not unresolved or any(f["severity"] == "error" for f in findings),
+        "findings": findings,
+        "unresolved": unresolved,
+    }
+
+def summarize(report: dict) -> str:
+    """
+    将检查结果整理为文本说明
+    """
+    if not report["findings"]:
+        return "未发现兼容性问题：架构、操作系统、包管理器及端口检查均通过。"
+    lines = []
+    errors = [f for f in report["findings"] if f["severity"] == "error"]
+    warnings = [f for f in report["findings"] if f["severity"] != "error"]
+    if errors:
+        lines.append(f"发现 {len(errors)} 个兼容性问题：")
+        lines.extend(f"{index}. {f['message']}" for index, f in enumerate(errors, 1))
+    if warnings:
+        lines.append("注意事项：")
+        lines.extend(f"- {f['message']}" for f in warnings)
+    return "\n".join(lines)
@@ -0,0 +1,231 @@
+import time
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.instance import Instance
+from app.utils import docker
+from app.utils.docker_async import async_docker
+from app.utils.docker_client import health_check
+
+logger = logging.getLogger(__name__)
+
+# Docker 容器状态到实例状态的映射
+STATUS_MAP = {
+    "running": "running",
+    "restarting": "running",
+    "created": "stopped",
+    "paused": "stopped",
+    "exited": "stopped",
+    "dead": "stopped",
+    "removing": "stopped",
+}
+
+# 会改变容器状态的事件
+STATE_EVENTS = {"create", "start", "restart", "die", "stop", "kill", "pause", "unpause", "oom", "destroy"}
+
+class ContainerStateCache:
+    """
+    由 Docker 事件驱动的容器状态缓存
+
+    后台线程订阅平台容器的事件流，事件到达时刷新缓存并同步 Instance.status；
+    状态查询直接命中缓存，缓存未命中时同一容器的并发查询合并为一次 Docker 调用
+    （线程中使用 get，async 路由中使用 aget）。
+    事件流断开期间缓存按 CONTAINER_STATE_TTL 过期。
+    """
+
+    def __init__(self):
+        self._states: Dict[str, Tuple[Optional[dict], float]] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._async_inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._events = None
+        self._listening = False
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="container-events", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        events = self._events
+        if events is not None:
+            try:
+                events.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _cached(self, container_id: str) -> Tuple[bool, Optional[dict]]:
+        with self._lock:
+            entry = self._states.get(container_id)
+        if entry is not None:
+            state, fetched_at = entry
+            fresh = time.monotonic() - fetched_at < settings.CONTAINER_STATE_TTL
+            # 事件流在线时，存在的容器缓存始终有效（变化会通过事件刷新）
+            if fresh or (self._listening and state is not None):
+                return True, state
+        return False, None
+
+    def get(self, container_id: str) -> Optional[dict]:
+        """
+        获取容器状态，优先使用缓存
+        """
+        hit, state = self._cached(container_id)
+        if hit:
+            return state
+        return self.refresh(container_id)
+
+    async def aget(self, container_id: str) -> Optional[dict]:
+        """
+        get 的异步版本，缓存未命中时通过异步 Docker 客户端获取
+        """
+        hit, state = self._cached(container_id)
+        if hit:
+            return state
+        return await self.arefresh(container_id)
+
+    def invalidate(self, container_id: str) -> None:
+        with self._lock:
+            self._states.pop(container_id, None)
+
+    def refresh(self, container_id: str) -> Optional[dict]:
+        """
+        从 Docker 重新获取容器状态，同一容器的并发请求共享一次调用
+        """
+        with self._lock:
+            future = self._inflight.get(container_id)
+            owner = future is None
+            if owner:
+                future = self._inflight[container_id] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            state = docker.get_container_status(container_id)
+            with self._lock:
+                self._states[container_id] = (state, time.monotonic())
+            future.set_result(state)
+            return state
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(container_id, None)
+
+    async def arefresh(self, container_id: str) -> Optional[dict]:
+        """
+        refresh 的异步版本，同一容器的并发请求共享一个任务；
+        单个请求被取消不会影响共享任务
+        """
+        task = self._async_inflight.get(container_id)
+        if task is None:
+            task = self._async_inflight[container_id] = asyncio.ensure_future(self._afetch(container_id))
+            task.add_done_callback(lambda _: self._async_inflight.pop(container_id, None))
+        return await asyncio.shield(task)
+
+    async def _afetch(self, container_id: str) -> Optional[dict]:
+        state = await async_docker.get_container_status(container_id)
+        with self._lock:
+            self._states[container_id] = (state, time.monotonic())
+        return state
+
+    def _run(self) -> None:
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                self._events = docker.container_events()
+                self.reconcile()
+                self._listening = True
+                backoff = 1
+                for event in self._events:
+                    if self._stop.is_set():
+                        break
+                    self._handle_event(event)
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning(f"Docker event stream interrupted: {str(e)}")
+                    # 守护进程重启后连接池中的连接已失效，检查失败时重建客户端
+                    health_check()
+            finally:
+                self._listening = False
+                self._events = None
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _handle_event(self, event: dict) -> None:
+        action = (event.get("Action") or event.get("status") or "").split(":")[0]
+        container_id = event.get("id") or event.get("Actor", {}).get("ID")
+        if not container_id or action not in STATE_EVENTS:
+            return
+
+        if action == "destroy":
+            with self._lock:
+                self._states[container_id] = (None, time.monotonic())
+            self._sync_instances({container_id: "stopped"})
+            return
+
+        state = self.refresh(container_id)
+        if state:
+            self._sync_instances({container_id: STATUS_MAP.get(state["status"], "stopped")})
+
+    def reconcile(self) -> None:
+        """
+        全量对账：一次列出所有平台容器，修正缓存与数据库中的实例状态
+        """
+        containers = docker.list_managed_containers()
+        if containers is None:
+            raise RuntimeError("Failed to list managed containers")
+
+        db = SessionLocal()
+        try:
+            known = [
+                row.container_id for row in
+                db.query(Instance.container_id).filter(Instance.container_id.isnot(None)).all()
+            ]
+        finally:
+            db.close()
+
+        with self._lock:
+            self._states.clear()
+
+        statuses: Dict[str, str] = {}
+        for container_id in known:
+            if container_id in containers:
+                statuses[container_id] = STATUS_MAP.get(containers[container_id]["State"], "stopped")
+            else:
+                # 未带管理标签的旧容器或已被删除的容器，单独确认
+                state = self.refresh(container_id)
+                statuses[container_id] = STATUS_MAP.get(state["status"], "stopped") if state else "stopped"
+        self._sync_instances(statuses)
+
+    def _sync_instances(self, statuses: Dict[str, str]) -> None:
+        if not statuses:
+            return
+        db = SessionLocal()
+        try:
+            instances = db.query(Instance).filter(Instance.container_id.in_(list(statuses))).all()
+            for instance in instances:
+                status = statuses[instance.container_id]
+                if instance.status != status:
+                    logger.info(f"Instance {instance.id} status {instance.status} -> {status}")
+                    instance.status = status
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error syncing instance status: {str(e)}", exc_info=True)
+            db.rollback()
+        finally:
+            db.close()
+
+state_cache = ContainerStateCache()
@@ -0,0 +1,283 @@
+import os
+import uuid
+import socket
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.instance import Instance
+from app.models.job import Job
+from app.utils import docker, build_logs
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, Job], Optional[dict]]
+
+def _handle_build(db: Session, job: Job) -> Optional[dict]:
+    """
+    构建任务：构建（或复用缓存）镜像，成功后排入启动任务
+    """
+    instance = db.query(Instance).filter(Instance.id == job.instance_id).first()
+    if not instance:
+        return {"skipped": True}
+
+    with build_logs.BuildLogWriter(instance.id) as writer:
+        writer.write(f"=== Build attempt {job.attempts}/{job.max_attempts} ===\n")
+        build = docker.build_image(instance.target, log=writer.write)
+    if not build:
+        raise RuntimeError("Image build failed")
+
+    enqueue(db, "start", instance.id, payload={"tag": build["tag"]})
+    return build
+
+def _handle_start(db: Session, job: Job) -> Optional[dict]:
+    """
+    启动任务：创建并启动容器，更新实例状态
+    """
+    instance = db.query(Instance).filter(Instance.id == job.instance_id).first()
+    if not instance:
+        return {"skipped": True}
+
+    name = f"instance-{instance.id}"
+    if job.attempts > 1:
+        # 上一次尝试可能已创建同名容器，先清理
+        docker.remove_container(name)
+
+    container_id = docker.create_container(
+        job.payload["tag"],
+        name,
+        instance.ports,
+        instance.environment,
+        instance_id=instance.id
+    )
+    if not container_id:
+        raise RuntimeError("Container creation failed")
+
+    instance.container_id = container_id
+    instance.status = "running"
+    return {"container_id": container_id}
+
+HANDLERS: Dict[str, JobHandler] = {
+    "build": _handle_build,
+    "start": _handle_start,
+}
+
+def enqueue(db: Session, kind: str, instance_id: int, payload: Optional[dict] = None) -> Job:
+    """
+    将任务加入队列（随调用方的事务一起提交）
+    """
+    job = Job(
+        kind=kind,
+        instance_id=instance_id,
+        status="pending",
+        attempts=0,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        payload=payload,
+        run_after=datetime.utcnow()
+    )
+    db.add(job)
+    # 提交后再唤醒对应工作线程，见 JobQueue.flush_notifications
+    db.info.setdefault("enqueued_job_kinds", set()).add(kind)
+    return job
+
+def has_active_job(db: Session, instance_id: int, kind: Optional[str] = None) -> bool:
+    """
+    实例是否还有待执行或执行中的任务
+    """
+    query = db.query(Job.id).filter(
+        Job.instance_id == instance_id,
+        Job.status.in_(["pending", "running"])
+    )
+    if kind:
+        query = query.filter(Job.kind == kind)
+    return query.first() is not None
+
+def delete_jobs(db: Session, instance_ids: List[int]) -> None:
+    """
+    删除实例的全部任务（随调用方的事务一起提交），避免留下指向已删除实例的任务
+    """
+    if instance_ids:
+        db.query(Job).filter(Job.instance_id.in_(instance_ids)).delete(synchronize_session=False)
+
+def build_in_progress(instance_id: int) -> bool:
+    """
+    实例是否还有未完成的构建任务（使用独立会话，供构建日志流轮询）
+    """
+    db = SessionLocal()
+    try:
+        return has_active_job(db, instance_id, "build")
+    finally:
+        db.close()
+
+class JobQueue:
+    """
+    基于数据库的持久化任务队列
+
+    构建与启动任务分别由独立的有界工作线程池处理；任务通过条件更新原子领取，
+    运行中的任务定期续约，租约过期（进程崩溃或重启）的任务会被重新排队。
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        # 容器内重启后主机名与 PID 往往不变，加随机后缀避免续约上一进程遗留的任务
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._wakeup = {kind: threading.Event() for kind in HANDLERS}
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        pools = {"build": settings.BUILD_WORKERS, "start": settings.START_WORKERS}
+        for kind, size in pools.items():
+            for i in range(max(1, size)):
+                self._spawn(self._worker, f"job-{kind}-{i}", kind)
+        self._spawn(self._maintenance, "job-maintenance")
+        logger.info(f"Job queue started: {pools}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        for event in self._wakeup.values():
+            event.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def notify(self, kind: str) -> None:
+        event = self._wakeup.get(kind)
+        if event:
+            event.set()
+
+    def flush_notifications(self, db: Session) -> None:
+        """
+        事务提交后唤醒新入队任务对应的工作线程
+        """
+        for kind in db.info.pop("enqueued_job_kinds", set()):
+            self.notify(kind)
+
+    def _spawn(self, target: Callable, name: str, *args) -> None:
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _worker(self, kind: str) -> None:
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once(kind)
+            except Exception as e:
+                logger.error(f"Error in {kind} worker: {str(e)}", exc_info=True)
+                processed = False
+            if not processed:
+                self._wakeup[kind].wait(settings.JOB_POLL_INTERVAL)
+                self._wakeup[kind].clear()
+
+    def _claim(self, db: Session, kind: str) -> Optional[Job]:
+        now = datetime.utcnow()
+        job = (
+            db.query(Job)
+            .filter(Job.kind == kind, Job.status == "pending", Job.run_after <= now)
+            .order_by(Job.id)
+            .first()
+        )
+        if not job:
+            return None
+
+        # 条件更新保证同一任务只被一个工作线程（或进程）领取
+        claimed = (
+            db.query(Job)
+            .filter(Job.id == job.id, Job.status == "pending")
+            .update({
+                "status": "running",
+                "attempts": Job.attempts + 1,
+                "worker_id": self.worker_id,
+                "heartbeat_at": now,
+            }, synchronize_session=False)
+        )
+        db.commit()
+        if not claimed:
+            return None
+        db.refresh(job)
+        return job
+
+    def run_once(self, kind: str) -> bool:
+        """
+        领取并执行一个任务，返回是否处理了任务
+        """
+        db = self.session_factory()
+        try:
+            job = self._claim(db, kind)
+            if not job:
+                return False
+
+            try:
+                result = HANDLERS[kind](db, job)
+                job.status = "succeeded"
+                job.result = result
+                job.error = None
+                db.commit()
+                self.flush_notifications(db)
+            except Exception as e:
+                logger.error(f"Job {job.id} ({kind}) failed: {str(e)}", exc_info=True)
+                db.rollback()
+                self._fail(db, job.id, str(e))
+            return True
+        finally:
+            db.close()
+
+    def _fail(self, db: Session, job_id: int, error: str) -> None:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            return
+        job.error = error
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            instance = db.query(Instance).filter(Instance.id == job.instance_id).first()
+            if instance:
+                instance.status = "failed"
+        else:
+            # 指数退避后重试
+            delay = settings.JOB_RETRY_BACKOFF * (2 ** (job.attempts - 1))
+            job.status = "pending"
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        db.commit()
+        db.info.pop("enqueued_job_kinds", None)
+
+    def _maintenance(self) -> None:
+        interval = max(1, settings.JOB_LEASE_SECONDS // 4)
+        while not self._stop.is_set():
+            try:
+                self.renew_and_recover()
+            except Exception as e:
+                logger.error(f"Error in job maintenance: {str(e)}", exc_info=True)
+            self._stop.wait(interval)
+
+    def renew_and_recover(self) -> None:
+        """
+        为本进程持有的任务续约，并回收租约过期的任务
+        """
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            db.query(Job).filter(
+                Job.status == "running", Job.worker_id == self.worker_id
+            ).update({"heartbeat_at": now}, synchronize_session=False)
+            db.commit()
+
+            expired = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+            stale = (
+                db.query(Job)
+                .filter(Job.status == "running", Job.heartbeat_at < expired)
+                .all()
+            )
+            for job in stale:
+                logger.warning(f"Recovering job {job.id} ({job.kind}) from {job.worker_id}")
+                self._fail(db, job.id, "Worker lease expired")
+                self.notify(job.kind)
+        finally:
+            db.close()
+
+job_queue = JobQueue()
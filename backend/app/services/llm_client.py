@@ -0,0 +1,127 @@
+import json
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+import httpx
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class LLMError(Exception):
+    """
+    LLM 接口调用失败
+    """
+
+class LLMClient:
+    """
+    OpenAI 兼容接口的异步客户端
+
+    复用连接池，全局并发数由 AI_MAX_CONCURRENCY 限制，超出的请求排队等待而不阻塞事件循环。
+    base_url / transport 可替换，便于连接本地替身服务进行测试。
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url or settings.API_BASE_URL
+        self.api_key = api_key or settings.BAILIAN_API_KEY
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max(1, settings.AI_MAX_CONCURRENCY))
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(settings.AI_TIMEOUT, connect=settings.AI_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.AI_MAX_CONCURRENCY,
+                    max_keepalive_connections=settings.AI_MAX_CONCURRENCY
+                ),
+                transport=self._transport
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _body(self, messages: List[Dict[str, str]], max_tokens: int, stream: bool, **options) -> dict:
+        return {
+            "model": options.get("model") or settings.AI_MODEL,
+            "messages": messages,
+            "temperature": options.get("temperature", 0.7),
+            "max_tokens": max_tokens,
+            "top_p": options.get("top_p", 0.95),
+            "stream": stream,
+        }
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 500,
+        timeout: Optional[float] = None,
+        **options
+    ) -> str:
+        """
+        发送对话补全请求，返回生成的文本（options: model/temperature/top_p）
+        """
+        body = self._body(messages, max_tokens, stream=False, **options)
+        async with self._semaphore:
+            try:
+                response = await self._get_client().post(
+                    "/chat/completions",
+                    json=body,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+                )
+            except httpx.HTTPError as e:
+                raise LLMError(f"Request failed: {str(e)}") from e
+
+        if response.status_code >= 400:
+            raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+        try:
+            choice = response.json()["choices"][0]
+        except (ValueError, KeyError, IndexError) as e:
+            raise LLMError("Unexpected response format") from e
+        if "message" in choice:
+            return (choice["message"].get("content") or "").strip()
+        return (choice.get("text") or "").strip()
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 500,
+        **options
+    ) -> AsyncIterator[str]:
+        """
+        流式对话补全，逐个产出增量文本；AI_TIMEOUT 作为相邻两段数据之间的读取超时。
+        迭代器被关闭（如客户端断开）时上游连接随之关闭
+        """
+        body = self._body(messages, max_tokens, stream=True, **options)
+        async with self._semaphore:
+            try:
+                async with self._get_client().stream("POST", "/chat/completions", json=body) as response:
+                    if response.status_code >= 400:
+                        await response.aread()
+                        raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            delta = json.loads(data)["choices"][0].get("delta") or {}
+                        except (ValueError, KeyError, IndexError):
+                            continue
+                        if delta.get("content"):
+                            yield delta["content"]
+            except httpx.HTTPError as e:
+                raise LLMError(f"Request failed: {str(e)}") from e
+
+llm_client = LLMClient()
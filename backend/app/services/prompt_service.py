@@ -1,6 +1,9 @@
 from typing import List, Dict, Any
 
 class PromptService:
+    # 提示词模板版本，修改任一模板时递增，使 AI 响应缓存失效
+    VERSION = 1
+
     @staticmethod
     def get_description_prompt(image: Dict[str, Any], software_list: List[Dict[str, Any]]) -> str:
         """
@@ -0,0 +1,210 @@
+import time
+import threading
+import logging
+from typing import Dict, Optional, Set, Tuple
+from app.core.config import settings
+from app.utils import docker, cgroup
+from app.utils.timeseries import RingSeries
+
+logger = logging.getLogger(__name__)
+
+CORE_FIELDS = ("cpu_percent", "memory_usage", "memory_limit", "memory_percent", "io_read_rate", "io_write_rate")
+NETWORK_FIELDS = ("rx_rate", "tx_rate")  # 字节/秒
+
+class ContainerSeries:
+    """
+    单个容器的资源时间序列：核心指标一个环形缓冲区，每个网卡一个速率缓冲区
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.core = RingSeries(CORE_FIELDS, capacity)
+        self.networks: Dict[str, RingSeries] = {}
+        self._previous: Optional[Tuple[float, dict]] = None
+
+    def add(self, stats: dict, timestamp: float) -> None:
+        """
+        记录一个样本（Docker stats 解析结果或 cgroupfs 累计计数器）
+
+        CPU 百分比缺失时由相邻两次 cpu_ns 计算；块 IO 与网卡速率由相邻两次累计值计算
+        """
+        previous = self._previous
+        elapsed = timestamp - previous[0] if previous else 0
+        last = previous[1] if previous else {}
+
+        def rate(current: int, before: Optional[int]) -> float:
+            if before is None or elapsed <= 0:
+                return 0.0
+            return max(current - before, 0) / elapsed
+
+        values = dict(stats)
+        if "cpu_percent" not in values:
+            values["cpu_percent"] = round(rate(stats["cpu_ns"], last.get("cpu_ns")) / 1e9 * 100, 2)
+        if "memory_percent" not in values:
+            limit = stats["memory_limit"]
+            values["memory_percent"] = round(stats["memory_usage"] / limit * 100, 2) if limit else 0.0
+        values["io_read_rate"] = rate(stats.get("io_read_bytes", 0), last.get("io_read_bytes"))
+        values["io_write_rate"] = rate(stats.get("io_write_bytes", 0), last.get("io_write_bytes"))
+        self.core.append(values, timestamp)
+
+        last_networks = last.get("networks") or {}
+        for name, counters in stats["networks"].items():
+            if name not in last_networks or elapsed <= 0:
+                continue
+            series = self.networks.get(name)
+            if series is None:
+                series = self.networks[name] = RingSeries(NETWORK_FIELDS, self.capacity)
+            series.append({
+                "rx_rate": rate(counters["rx_bytes"], last_networks[name]["rx_bytes"]),
+                "tx_rate": rate(counters["tx_bytes"], last_networks[name]["tx_bytes"]),
+            }, timestamp)
+        self._previous = (timestamp, stats)
+
+    def snapshot(self, window: Optional[float] = None) -> Optional[dict]:
+        """
+        最新指标；指定 window（秒）时附带该时间窗口内的序列
+        """
+        latest = self.core.latest()
+        if latest is None:
+            return None
+        result = {
+            **latest,
+            **docker.cumulative_totals(self._previous[1]),
+            "networks": {name: series.latest() for name, series in self.networks.items()},
+        }
+        if window:
+            result["series"] = {
+                **self.core.window(window),
+                "networks": {name: series.window(window) for name, series in self.networks.items()},
+            }
+        return result
+
+class StatsCollector:
+    """
+    容器资源统计采集器
+
+    cgroupfs 可读时（STATS_SOURCE 为 auto/cgroup）每个周期一次性读取所有运行中容器的计数器；
+    否则（或 cgroupfs 中找不到的容器）为每个容器维持一个 Docker stats 流。
+    样本写入固定大小的环形缓冲区，查询接口直接读取缓冲区，无需等待 Docker 采样。
+    """
+
+    def __init__(self):
+        self._series: Dict[str, ContainerSeries] = {}
+        self._streams: Dict[str, threading.Thread] = {}
+        self._running: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread or not settings.STATS_COLLECTOR_ENABLED:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-collector", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def get(self, container_id: str) -> Optional[ContainerSeries]:
+        with self._lock:
+            return self._series.get(container_id)
+
+    def totals(self) -> dict:
+        """
+        所有运行中容器的最新资源用量汇总
+        """
+        with self._lock:
+            series = [self._series[c] for c in self._running if c in self._series]
+        samples = [s.core.latest() for s in series]
+        samples = [s for s in samples if s]
+        return {
+            "containers": len(samples),
+            "cpu_percent": round(sum(s["cpu_percent"] for s in samples), 2),
+            "memory_usage": sum(s["memory_usage"] for s in samples),
+        }
+
+    def use_cgroup(self) -> bool:
+        return settings.STATS_SOURCE in ("auto", "cgroup") and cgroup.available()
+
+    def _run(self) -> None:
+        last_sync = 0.0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now - last_sync >= settings.STATS_SYNC_INTERVAL:
+                last_sync = now
+                try:
+                    self.sync()
+                except Exception as e:
+                    logger.error(f"Error syncing stats streams: {str(e)}", exc_info=True)
+            if self.use_cgroup():
+                try:
+                    self.poll_cgroup()
+                except Exception as e:
+                    logger.error(f"Error reading cgroup stats: {str(e)}", exc_info=True)
+            self._stop.wait(settings.STATS_POLL_INTERVAL if self.use_cgroup() else settings.STATS_SYNC_INTERVAL)
+
+    def sync(self) -> None:
+        """
+        刷新运行中容器列表，清理已停止或删除容器的数据（查询时回退到 Docker 实时采样）；
+        cgroupfs 不可用或找不到容器时为其启动 Docker stats 流
+        """
+        containers = docker.list_managed_containers()
+        if containers is None:
+            return
+        running = {c for c, summary in containers.items() if summary["State"] == "running"}
+        found = set(cgroup.read_container_stats(running)) if self.use_cgroup() else set()
+        if settings.STATS_SOURCE == "cgroup":
+            fallback = set()
+        else:
+            fallback = running - found
+
+        with self._lock:
+            self._running = running
+            for container_id in list(self._series):
+                if container_id not in running:
+                    self._series.pop(container_id, None)
+            for container_id in running:
+                if container_id not in self._series:
+                    self._series[container_id] = ContainerSeries(settings.STATS_BUFFER_SIZE)
+            for container_id in fallback:
+                if container_id in self._streams:
+                    continue
+                thread = threading.Thread(
+                    target=self._stream,
+                    args=(container_id, self._series[container_id]),
+                    name=f"stats-{container_id[:12]}",
+                    daemon=True
+                )
+                self._streams[container_id] = thread
+                thread.start()
+
+    def poll_cgroup(self) -> None:
+        """
+        一次遍历读取所有运行中容器的 cgroupfs 计数器
+        """
+        with self._lock:
+            targets = [c for c in self._running if c not in self._streams]
+        timestamp = time.time()
+        for container_id, stats in cgroup.read_container_stats(targets).items():
+            series = self.get(container_id)
+            if series is not None:
+                series.add(stats, timestamp)
+
+    def _stream(self, container_id: str, series: ContainerSeries) -> None:
+        try:
+            for sample in docker.stream_container_stats(container_id):
+                # 容器停止后其序列已被清理（重启后会换成新序列），结束旧的流
+                if self._stop.is_set() or self.get(container_id) is not series:
+                    break
+                series.add(docker.parse_stats_sample(sample), time.time())
+        except Exception as e:
+            logger.warning(f"Stats stream for {container_id[:12]} ended: {str(e)}")
+        finally:
+            with self._lock:
+                self._streams.pop(container_id, None)
+
+stats_collector = StatsCollector()
@@ -0,0 +1,83 @@
+import os
+import time
+import threading
+import logging
+from typing import Dict, Optional
+import psutil
+from app.core.config import settings
+from app.utils.timeseries import RingSeries
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_FIELDS = ("cpu_percent", "memory_percent", "disk_percent", "load_1", "load_5", "load_15")
+
+class SystemMetricsSampler:
+    """
+    主机资源采样器
+
+    后台线程按固定间隔记录 CPU、内存、磁盘使用率与系统负载，写入固定大小的环形缓冲区。
+    CPU 使用率取两次采样之间的平均值（cpu_percent(interval=None)），采样本身不阻塞；
+    仪表盘直接读取缓冲区，无需等待采样间隔。
+    """
+
+    def __init__(self):
+        self.series = RingSeries(SYSTEM_FIELDS, settings.SYSTEM_METRICS_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread or not settings.SYSTEM_METRICS_ENABLED:
+            return
+        # 首次调用只建立 CPU 计数基准，返回值无意义
+        psutil.cpu_percent(interval=None)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="system-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.SYSTEM_METRICS_INTERVAL):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling system metrics: {str(e)}", exc_info=True)
+
+    def sample(self) -> Dict[str, float]:
+        """
+        采集一个样本并写入缓冲区
+        """
+        with self._lock:
+            try:
+                load_1, load_5, load_15 = os.getloadavg()
+            except (AttributeError, OSError):
+                load_1 = load_5 = load_15 = 0.0
+            values = {
+                "cpu_percent": psutil.cpu_percent(interval=None),
+                "memory_percent": psutil.virtual_memory().percent,
+                "disk_percent": psutil.disk_usage(settings.SYSTEM_METRICS_DISK_PATH).percent,
+                "load_1": load_1,
+                "load_5": load_5,
+                "load_15": load_15,
+            }
+            self.series.append(values, time.time())
+            return values
+
+    def latest(self) -> Dict[str, float]:
+        """
+        最新样本；采样线程尚未产生样本（或未启用）时当场采集一次
+        """
+        return self.series.latest() or self.sample()
+
+    def history(self, seconds: Optional[float] = None) -> Dict[str, list]:
+        """
+        最近 seconds 秒内的样本（列式），seconds 为空时返回全部
+        """
+        return self.series.window(seconds)
+
+system_metrics = SystemMetricsSampler()
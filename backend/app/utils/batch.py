@@ -0,0 +1,33 @@
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable
+
+async def run_parallel(
+    fn: Callable[[Any], Awaitable[bool]],
+    items: Iterable[Hashable],
+    parallelism: int,
+    timeout: float
+) -> Dict[Hashable, dict]:
+    """
+    并发执行批量操作
+
+    并发数由信号量限制，每个调用从获取到信号量时开始计时，超过 timeout 秒即取消并判定超时。
+    返回 {item: {"ok", "elapsed_ms", "error"}}
+    """
+    items = list(items)
+    semaphore = asyncio.Semaphore(max(1, parallelism))
+
+    async def task(item) -> dict:
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                ok = bool(await asyncio.wait_for(fn(item), timeout))
+                error = None if ok else "Operation failed"
+            except asyncio.TimeoutError:
+                ok, error = False, f"Timed out after {timeout}s"
+            except Exception as e:
+                ok, error = False, str(e)
+            return {"ok": ok, "elapsed_ms": round((time.monotonic() - started) * 1000, 1), "error": error}
+
+    outcomes = await asyncio.gather(*(task(item) for item in items))
+    return dict(zip(items, outcomes))
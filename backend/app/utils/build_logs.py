@@ -0,0 +1,145 @@
+import os
+import asyncio
+import threading
+from typing import AsyncIterator, Callable, Optional, Tuple
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.utils.sse import format_sse, sse_comment
+
+_write_lock = threading.Lock()
+
+def log_path(instance_id: int) -> str:
+    """
+    实例构建日志文件路径
+    """
+    return os.path.join(settings.BUILD_LOG_DIR, f"instance-{instance_id}.log")
+
+def exists(instance_id: int) -> bool:
+    return os.path.exists(log_path(instance_id))
+
+def remove(instance_id: int) -> None:
+    """
+    删除实例的构建日志文件（实例删除时调用）
+    """
+    try:
+        os.remove(log_path(instance_id))
+    except FileNotFoundError:
+        pass
+
+class BuildLogWriter:
+    """
+    构建日志写入器：追加写入磁盘文件，超过 BUILD_LOG_MAX_BYTES 后截断
+    """
+
+    def __init__(self, instance_id: int):
+        os.makedirs(settings.BUILD_LOG_DIR, exist_ok=True)
+        self.path = log_path(instance_id)
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        self._truncated = False
+
+    def write(self, text: str) -> None:
+        if self._truncated:
+            return
+        data = text.encode("utf-8", errors="replace")
+        with _write_lock:
+            if self._size + len(data) > settings.BUILD_LOG_MAX_BYTES:
+                data = b"[build log truncated]\n"
+                self._truncated = True
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "BuildLogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def read_lines(instance_id: int, offset: int, final: bool = False, max_bytes: int = 64 * 1024) -> Tuple[list, int]:
+    """
+    从字节偏移处读取完整的日志行，返回 [(行结束偏移, 行内容)] 与新的偏移
+
+    final 为 True 时（构建已结束）同时返回末尾未换行的内容；
+    单行超过 max_bytes 时先返回已读到的部分，避免偏移无法前进
+    """
+    path = log_path(instance_id)
+    if not os.path.exists(path):
+        return [], offset
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(max_bytes)
+
+    # 只返回完整的行，未写完的行留到下次读取
+    end = len(data) - 1 if final or len(data) >= max_bytes and b"\n" not in data else data.rfind(b"\n")
+    if end < 0:
+        return [], offset
+
+    lines = []
+    position = offset
+    for raw in data[:end + 1].splitlines(keepends=True):
+        position += len(raw)
+        lines.append((position, raw.rstrip(b"\r\n").decode("utf-8", errors="replace")))
+    return lines, position
+
+def build_log_response(
+    instance_id: int,
+    offset: int,
+    last_event_id: Optional[str],
+    is_active: Callable[[], bool]
+) -> StreamingResponse:
+    """
+    构建日志 SSE 响应，Last-Event-ID 优先于 offset 参数
+    """
+    if last_event_id and last_event_id.isdigit():
+        offset = int(last_event_id)
+
+    return StreamingResponse(
+        stream_build_log(instance_id, max(0, offset), is_active),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_build_log(
+    instance_id: int,
+    offset: int,
+    is_active: Callable[[], bool]
+) -> AsyncIterator[str]:
+    """
+    以 SSE 流式输出构建日志
+
+    每条消息的 id 为该行结束处的字节偏移，客户端可据此（Last-Event-ID）断点续传；
+    is_active 返回 False（构建结束）且日志读完后发送 end 事件并结束
+    """
+    loop = asyncio.get_running_loop()
+    last_check = 0.0
+    last_sent = loop.time()
+    while True:
+        lines, offset = read_lines(instance_id, offset)
+        for position, line in lines:
+            yield format_sse(line, id=position)
+        if lines:
+            last_sent = loop.time()
+            continue
+
+        now = loop.time()
+        if now - last_check >= settings.BUILD_LOG_STATUS_INTERVAL:
+            last_check = now
+            if not await run_in_threadpool(is_active):
+                lines, offset = read_lines(instance_id, offset, final=True)
+                for position, line in lines:
+                    yield format_sse(line, id=position)
+                if not lines:
+                    yield format_sse("", event="end", id=offset)
+                    return
+                continue
+
+        if now - last_sent >= 15:
+            yield sse_comment()
+            last_sent = now
+        await asyncio.sleep(settings.BUILD_LOG_POLL_INTERVAL)
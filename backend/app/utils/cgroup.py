@@ -0,0 +1,162 @@
+import os
+import logging
+import psutil
+from typing import Dict, Iterable, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# cgroup v1 中各控制器可能的目录名
+V1_CONTROLLERS = {
+    "cpu": ("cpuacct", "cpu,cpuacct", "cpuacct,cpu"),
+    "memory": ("memory",),
+    "blkio": ("blkio",),
+}
+
+# v1 中表示“无限制”的内存上限阈值
+UNLIMITED_MEMORY = 1 << 60
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _read_int(path: str) -> Optional[int]:
+    content = _read(path)
+    if content is None:
+        return None
+    content = content.strip()
+    return int(content) if content.isdigit() else None
+
+def _read_kv(path: str) -> Dict[str, int]:
+    content = _read(path) or ""
+    result = {}
+    for line in content.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[1].isdigit():
+            result[parts[0]] = int(parts[1])
+    return result
+
+def is_v2() -> bool:
+    return os.path.exists(os.path.join(settings.CGROUP_ROOT, "cgroup.controllers"))
+
+def available() -> bool:
+    """
+    cgroupfs 是否可读
+    """
+    return os.access(settings.CGROUP_ROOT, os.R_OK | os.X_OK)
+
+def _container_dirs(root: str, container_id: str) -> Iterable[str]:
+    # systemd 与 cgroupfs 两种驱动的目录布局
+    yield os.path.join(root, "system.slice", f"docker-{container_id}.scope")
+    yield os.path.join(root, "docker", container_id)
+
+def _find_dir(root: str, container_id: str) -> Optional[str]:
+    return next((d for d in _container_dirs(root, container_id) if os.path.isdir(d)), None)
+
+def _host_memory() -> int:
+    return psutil.virtual_memory().total
+
+def _network_counters(cgroup_dir: str) -> Dict[str, dict]:
+    """
+    通过容器内任一进程的 /proc/<pid>/net/dev 读取各网卡累计流量
+    （后端需与宿主机共享 PID 命名空间，否则返回空）
+    """
+    procs = _read(os.path.join(cgroup_dir, "cgroup.procs")) or ""
+    pid = next((line.strip() for line in procs.splitlines() if line.strip()), None)
+    if not pid:
+        return {}
+    content = _read(f"/proc/{pid}/net/dev")
+    if content is None:
+        return {}
+    networks = {}
+    for line in content.splitlines()[2:]:
+        name, _, data = line.partition(":")
+        fields = data.split()
+        name = name.strip()
+        if len(fields) >= 9 and name != "lo":
+            networks[name] = {"rx_bytes": int(fields[0]), "tx_bytes": int(fields[8])}
+    return networks
+
+def _read_v2(root: str, container_id: str) -> Optional[dict]:
+    cgroup_dir = _find_dir(root, container_id)
+    if not cgroup_dir:
+        return None
+    cpu = _read_kv(os.path.join(cgroup_dir, "cpu.stat"))
+    memory_usage = _read_int(os.path.join(cgroup_dir, "memory.current")) or 0
+    memory_limit = _read_int(os.path.join(cgroup_dir, "memory.max")) or _host_memory()  # "max" 表示无限制
+    inactive_file = _read_kv(os.path.join(cgroup_dir, "memory.stat")).get("inactive_file", 0)
+
+    io_read = io_write = 0
+    for line in (_read(os.path.join(cgroup_dir, "io.stat")) or "").splitlines():
+        for item in line.split()[1:]:
+            key, _, value = item.partition("=")
+            if key == "rbytes":
+                io_read += int(value)
+            elif key == "wbytes":
+                io_write += int(value)
+
+    return {
+        "cpu_ns": cpu.get("usage_usec", 0) * 1000,
+        "memory_usage": max(memory_usage - inactive_file, 0),
+        "memory_limit": memory_limit,
+        "io_read_bytes": io_read,
+        "io_write_bytes": io_write,
+        "networks": _network_counters(cgroup_dir),
+    }
+
+def _read_v1(root: str, container_id: str) -> Optional[dict]:
+    dirs = {}
+    for kind, names in V1_CONTROLLERS.items():
+        dirs[kind] = next(
+            (d for name in names for d in [_find_dir(os.path.join(root, name), container_id)] if d),
+            None
+        )
+    if not dirs["cpu"] or not dirs["memory"]:
+        return None
+
+    memory_usage = _read_int(os.path.join(dirs["memory"], "memory.usage_in_bytes")) or 0
+    memory_limit = _read_int(os.path.join(dirs["memory"], "memory.limit_in_bytes")) or 0
+    if not memory_limit or memory_limit >= UNLIMITED_MEMORY:
+        memory_limit = _host_memory()
+    inactive_file = _read_kv(os.path.join(dirs["memory"], "memory.stat")).get("total_inactive_file", 0)
+
+    io_read = io_write = 0
+    if dirs["blkio"]:
+        content = _read(os.path.join(dirs["blkio"], "blkio.throttle.io_service_bytes")) or ""
+        for line in content.splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[1] == "Read":
+                io_read += int(parts[2])
+            elif len(parts) == 3 and parts[1] == "Write":
+                io_write += int(parts[2])
+
+    return {
+        "cpu_ns": _read_int(os.path.join(dirs["cpu"], "cpuacct.usage")) or 0,
+        "memory_usage": max(memory_usage - inactive_file, 0),
+        "memory_limit": memory_limit,
+        "io_read_bytes": io_read,
+        "io_write_bytes": io_write,
+        "networks": _network_counters(dirs["cpu"]),
+    }
+
+def read_container_stats(container_ids: Iterable[str]) -> Dict[str, dict]:
+    """
+    一次遍历读取多个容器的累计计数器（CPU 纳秒、内存、块 IO、网卡流量）
+
+    只返回在 cgroupfs 中找到的容器，未找到的容器由调用方回退到 Docker API
+    """
+    root = settings.CGROUP_ROOT
+    reader = _read_v2 if is_v2() else _read_v1
+    results = {}
+    for container_id in container_ids:
+        try:
+            stats = reader(root, container_id)
+        except Exception as e:
+            logger.debug(f"Error reading cgroup stats for {container_id[:12]}: {str(e)}")
+            stats = None
+        if stats is not None:
+            results[container_id] = stats
+    return results
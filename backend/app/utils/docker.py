@@ -1,70 +1,203 @@
 import docker
-from typing import Dict, Optional
+import hashlib
+import io
+import tarfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Union
+from app.core.config import settings
 from app.models.target import Target
+from app.utils.docker_client import get_client, get_long_client
 import logging
 
 logger = logging.getLogger(__name__)
-client = docker.from_env()
 
-def build_image(target: Target) -> Optional[str]:
+# 构建缓存：镜像以 Dockerfile + 基础镜像的内容哈希命名
+BUILD_CACHE_REPOSITORY = "aivul-build-cache"
+BUILD_HASH_LABEL = "aivul.build-hash"
+
+# 平台管理的容器标签，用于事件订阅与批量查询
+MANAGED_LABEL = "aivul.managed"
+INSTANCE_LABEL = "aivul.instance-id"
+
+# 同一哈希的构建串行执行，避免并发重复构建；值为 [锁, 持有及等待的构建数]，归零时移除
+_build_locks: Dict[str, List] = {}
+_build_locks_guard = threading.Lock()
+
+def _normalize_dockerfile(dockerfile: str) -> str:
+    """
+    规范化 Dockerfile（统一换行符、去除行尾空白），使仅有空白差异的内容命中同一缓存
+    """
+    lines = dockerfile.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip() + '\n'
+
+def compute_build_hash(target: Target) -> str:
+    """
+    计算靶标的构建缓存键：有效 Dockerfile 与基础镜像的 SHA-256
+    """
+    base_image = target.base_image.registry_path if target.base_image else ""
+    hasher = hashlib.sha256()
+    hasher.update(base_image.encode('utf-8'))
+    hasher.update(b'\0')
+    hasher.update(_normalize_dockerfile(target.dockerfile or "").encode('utf-8'))
+    return hasher.hexdigest()
+
+@contextmanager
+def _build_lock(build_hash: str) -> Iterator[None]:
+    """
+    持有构建哈希对应的锁；最后一个使用者退出时移除该锁，锁表不随构建次数增长
+    """
+    with _build_locks_guard:
+        entry = _build_locks.setdefault(build_hash, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _build_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _build_locks.pop(build_hash, None)
+
+def get_cached_image(build_hash: str) -> Optional[docker.models.images.Image]:
+    """
+    按构建哈希查找已存在的缓存镜像
+    """
+    try:
+        return get_client().images.get(f"{BUILD_CACHE_REPOSITORY}:{build_hash[:32]}")
+    except docker.errors.ImageNotFound:
+        return None
+
+def make_build_context(dockerfile: str) -> io.BytesIO:
+    """
+    在内存中生成最小构建上下文（仅包含 Dockerfile）
+    """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as tar:
+        data = dockerfile.encode('utf-8')
+        info = tarfile.TarInfo(name="Dockerfile")
+        info.size = len(data)
+        info.mtime = 0  # 固定时间戳，保证上下文内容可复现
+        tar.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+def _stream_build(context: io.BytesIO, tag: str, labels: Dict[str, str], log: Callable[[str], None]) -> str:
+    """
+    以流式方式构建镜像，边构建边输出日志，返回镜像 ID
+    """
+    image_id = None
+    for chunk in get_long_client().api.build(
+        fileobj=context,
+        custom_context=True,
+        dockerfile="Dockerfile",
+        tag=tag,
+        labels=labels,
+        rm=True,
+        decode=True
+    ):
+        if "error" in chunk:
+            log(chunk["error"].rstrip("\n") + "\n")
+            raise docker.errors.BuildError(chunk["error"], [])
+        if "stream" in chunk:
+            log(chunk["stream"])
+        elif "status" in chunk:
+            log(f"{chunk['status']} {chunk.get('progress', '')}".rstrip() + "\n")
+        elif "aux" in chunk and "ID" in chunk["aux"]:
+            image_id = chunk["aux"]["ID"]
+
+    if image_id is None:
+        image_id = get_client().images.get(tag).id
+    return image_id
+
+def build_image(
+    target: Target,
+    log: Optional[Callable[[str], None]] = None
+) -> Optional[dict]:
     """
     构建Docker镜像
+
+    相同 Dockerfile 与基础镜像的靶标复用已构建的缓存镜像，不再重复构建。
+    构建输出逐段写入 log 回调；返回构建元数据：tag、build_hash、cached、context_size、duration
     """
+    log = log or (lambda text: None)
     try:
-        # 创建临时Dockerfile
-        import tempfile
-        import os
-        
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.dockerfile') as f:
-            f.write(target.dockerfile)
-            dockerfile_path = f.name
-        
-        # 构建镜像
         tag = f"target-{target.id}:latest"
-        image, logs = client.images.build(
-            path=os.path.dirname(dockerfile_path),
-            dockerfile=os.path.basename(dockerfile_path),
-            tag=tag,
-            rm=True
-        )
-        
-        # 清理临时文件
-        os.unlink(dockerfile_path)
-        
-        return tag
+        build_hash = compute_build_hash(target)
+        cache_tag = f"{BUILD_CACHE_REPOSITORY}:{build_hash[:32]}"
+        started = time.monotonic()
+
+        with _build_lock(build_hash):
+            if settings.BUILD_CACHE_ENABLED:
+                cached = get_cached_image(build_hash)
+                if cached is not None:
+                    logger.info(f"Build cache hit for target {target.id}: {cache_tag}")
+                    log(f"Using cached image {cache_tag}\n")
+                    cached.tag(f"target-{target.id}", "latest")
+                    return {
+                        "tag": tag,
+                        "build_hash": build_hash,
+                        "cached": True,
+                        "context_size": 0,
+                        "duration": round(time.monotonic() - started, 3)
+                    }
+
+            # 构建镜像
+            context = make_build_context(target.dockerfile)
+            context_size = context.getbuffer().nbytes
+            log(f"Sending build context ({context_size} bytes)\n")
+            image_id = _stream_build(context, cache_tag, {BUILD_HASH_LABEL: build_hash}, log)
+            get_client().api.tag(image_id, f"target-{target.id}", "latest")
+
+        metadata = {
+            "tag": tag,
+            "build_hash": build_hash,
+            "cached": False,
+            "context_size": context_size,
+            "duration": round(time.monotonic() - started, 3)
+        }
+        logger.info(f"Built image for target {target.id}: {metadata}")
+        return metadata
     except Exception as e:
         logger.error(f"Error building image: {str(e)}", exc_info=True)
+        log(f"Error building image: {str(e)}\n")
         return None
 
 def create_container(
     image_tag: str,
     name: str,
     ports: Dict[str, str] = None,
-    environment: Dict[str, str] = None
+    environment: Dict[str, str] = None,
+    instance_id: Optional[int] = None
 ) -> Optional[str]:
     """
-    创建并启动容器
+    创建并启动容器（带平台管理标签）
     """
     try:
-        container = client.containers.run(
+        labels = {MANAGED_LABEL: "true"}
+        if instance_id is not None:
+            labels[INSTANCE_LABEL] = str(instance_id)
+        container = get_client().containers.run(
             image_tag,
             name=name,
             detach=True,
             ports=ports,
-            environment=environment
+            environment=environment,
+            labels=labels
         )
         return container.id
     except Exception as e:
         logger.error(f"Error creating container: {str(e)}", exc_info=True)
         return None
 
-def stop_container(container_id: str) -> bool:
+def stop_container(container_id: str, timeout: Optional[int] = None) -> bool:
     """
     停止容器
+    - timeout: 强制终止前的等待时间（秒），默认 DOCKER_STOP_TIMEOUT
     """
     try:
-        container = client.containers.get(container_id)
-        container.stop()
+        get_client().api.stop(container_id, timeout=timeout if timeout is not None else settings.DOCKER_STOP_TIMEOUT)
         return True
     except Exception as e:
         logger.error(f"Error stopping container: {str(e)}", exc_info=True)
@@ -75,8 +208,10 @@ def remove_container(container_id: str) -> bool:
     删除容器
     """
     try:
-        container = client.containers.get(container_id)
-        container.remove(force=True)
+        get_client().api.remove_container(container_id, force=True)
+        return True
+    except docker.errors.NotFound:
+        # 容器已不存在，视为删除成功
         return True
     except Exception as e:
         logger.error(f"Error removing container: {str(e)}", exc_info=True)
@@ -87,67 +222,169 @@ def get_container_status(container_id: str) -> Optional[dict]:
     获取容器状态信息
     """
     try:
-        container = client.containers.get(container_id)
+        container = get_client().containers.get(container_id)
         return {
             "status": container.status,
             "started_at": container.attrs['State']['StartedAt'],
             "platform": container.attrs['Platform'],
-            "image": container.image.tags[0] if container.image.tags else None,
+            "image": container.attrs['Config']['Image'],
             "ports": container.ports,
             "network_settings": container.attrs['NetworkSettings']['Networks']
         }
+    except docker.errors.NotFound:
+        # 容器已被删除属于正常情况，不记录错误
+        return None
     except Exception as e:
         logger.error(f"Error getting container status: {str(e)}", exc_info=True)
         return None
 
+def list_managed_containers() -> Optional[Dict[str, dict]]:
+    """
+    一次调用获取所有平台管理容器的摘要信息（按容器 ID 索引）
+    """
+    try:
+        containers = get_client().api.containers(all=True, filters={"label": f"{MANAGED_LABEL}=true"})
+        return {c["Id"]: c for c in containers}
+    except Exception as e:
+        logger.error(f"Error listing containers: {str(e)}", exc_info=True)
+        return None
+
+def container_events():
+    """
+    订阅平台管理容器的 Docker 事件流（阻塞生成器）
+    """
+    return get_long_client().events(
+        decode=True,
+        filters={"type": "container", "label": f"{MANAGED_LABEL}=true"}
+    )
+
 def get_container_logs(container_id: str, tail: int = 100) -> Optional[str]:
     """
     获取容器日志
     """
     try:
-        container = client.containers.get(container_id)
-        logs = container.logs(tail=tail, timestamps=True).decode('utf-8')
+        logs = get_client().api.logs(container_id, tail=tail, timestamps=True).decode('utf-8')
         return logs
     except Exception as e:
         logger.error(f"Error getting container logs: {str(e)}", exc_info=True)
         return None
 
+def stream_container_logs(
+    container_id: str,
+    follow: bool = False,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    tail: Union[int, str] = "all",
+    stdout: bool = True,
+    stderr: bool = True
+):
+    """
+    以流的形式读取容器日志（带时间戳），返回字节块生成器，不拼接完整日志
+    """
+    try:
+        return get_long_client().api.logs(
+            container_id,
+            stream=True,
+            follow=follow,
+            since=since,
+            until=until,
+            tail=tail,
+            stdout=stdout,
+            stderr=stderr,
+            timestamps=True
+        )
+    except Exception as e:
+        logger.error(f"Error streaming container logs: {str(e)}", exc_info=True)
+        return None
+
 def restart_container(container_id: str) -> bool:
     """
     重启容器
     """
     try:
-        container = client.containers.get(container_id)
+        container = get_client().containers.get(container_id)
         container.restart()
         return True
     except Exception as e:
         logger.error(f"Error restarting container: {str(e)}", exc_info=True)
         return False
 
+def parse_stats_sample(sample: dict) -> dict:
+    """
+    将 Docker stats 样本解析为 CPU 百分比、内存使用、块 IO 及各网卡累计流量
+    """
+    cpu = sample.get("cpu_stats") or {}
+    precpu = sample.get("precpu_stats") or {}
+    cpu_delta = cpu.get("cpu_usage", {}).get("total_usage", 0) - precpu.get("cpu_usage", {}).get("total_usage", 0)
+    system_delta = cpu.get("system_cpu_usage", 0) - precpu.get("system_cpu_usage", 0)
+    online_cpus = cpu.get("online_cpus") or len(cpu.get("cpu_usage", {}).get("percpu_usage") or []) or 1
+    cpu_percent = cpu_delta / system_delta * online_cpus * 100 if system_delta > 0 and cpu_delta > 0 else 0.0
+
+    memory = sample.get("memory_stats") or {}
+    memory_detail = memory.get("stats") or {}
+    # cgroup v2 使用 inactive_file，v1 使用 cache
+    cache = memory_detail.get("inactive_file", memory_detail.get("cache", 0))
+    memory_usage = max(memory.get("usage", 0) - cache, 0)
+    memory_limit = memory.get("limit", 0)
+
+    io_read = io_write = 0
+    for entry in (sample.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []:
+        op = entry.get("op", "").lower()
+        if op == "read":
+            io_read += entry.get("value", 0)
+        elif op == "write":
+            io_write += entry.get("value", 0)
+
+    result = {
+        "cpu_percent": round(cpu_percent, 2),
+        "cpu_ns": cpu.get("cpu_usage", {}).get("total_usage", 0),
+        "memory_usage": memory_usage,
+        "memory_limit": memory_limit,
+        "memory_percent": round(memory_usage / memory_limit * 100, 2) if memory_limit else 0.0,
+        "io_read_bytes": io_read,
+        "io_write_bytes": io_write,
+        "networks": {
+            name: {"rx_bytes": counters.get("rx_bytes", 0), "tx_bytes": counters.get("tx_bytes", 0)}
+            for name, counters in (sample.get("networks") or {}).items()
+        }
+    }
+    result.update(cumulative_totals(result))
+    return result
+
+def cumulative_totals(stats: dict) -> dict:
+    """
+    与早期接口兼容的累计值：cpu_usage（CPU 纳秒）与 network_rx/network_tx（所有网卡合计字节）
+    """
+    networks = (stats.get("networks") or {}).values()
+    return {
+        "cpu_usage": stats.get("cpu_ns", 0),
+        "network_rx": sum(counters["rx_bytes"] for counters in networks),
+        "network_tx": sum(counters["tx_bytes"] for counters in networks),
+    }
+
 def get_container_stats(container_id: str) -> Optional[dict]:
     """
-    获取容器资源使用统计
+    获取容器资源使用统计（单次采样，Docker 需采样两次，约耗时 2 秒）
     """
     try:
-        container = client.containers.get(container_id)
-        stats = container.stats(stream=False)
-        return {
-            "cpu_usage": stats["cpu_stats"]["cpu_usage"]["total_usage"],
-            "memory_usage": stats["memory_stats"]["usage"],
-            "memory_limit": stats["memory_stats"]["limit"],
-            "network_rx": stats["networks"]["eth0"]["rx_bytes"],
-            "network_tx": stats["networks"]["eth0"]["tx_bytes"]
-        }
+        stats = get_client().api.stats(container_id, stream=False)
+        return parse_stats_sample(stats)
     except Exception as e:
         logger.error(f"Error getting container stats: {str(e)}", exc_info=True)
         return None
 
+def stream_container_stats(container_id: str):
+    """
+    持续读取容器资源统计（阻塞生成器，约每秒一个样本，容器停止后结束）
+    """
+    return get_long_client().api.stats(container_id, stream=True, decode=True)
+
 def execute_command(container_id: str, cmd: str) -> Optional[tuple]:
     """
     在容器中执行命令
     """
     try:
-        container = client.containers.get(container_id)
+        container = get_client().containers.get(container_id)
         exit_code, output = container.exec_run(cmd)
         return (exit_code, output.decode('utf-8'))
     except Exception as e:
@@ -0,0 +1,394 @@
+import json
+import shlex
+import struct
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import urlparse
+import httpx
+from app.core.config import settings
+from app.utils.docker import MANAGED_LABEL, INSTANCE_LABEL, parse_stats_sample
+
+logger = logging.getLogger(__name__)
+
+# 多路复用流中的流类型
+STREAM_TYPES = {0: "stdin", 1: "stdout", 2: "stderr"}
+
+class DockerAPIError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+
+class AsyncDockerClient:
+    """
+    基于 asyncio 的 Docker Engine API 客户端
+
+    直接通过 unix socket（或 tcp）访问 Docker，不占用线程池线程；
+    提供与 app.utils.docker 相同的容器操作及返回约定（失败时记录日志并返回 None/False）。
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or settings.DOCKER_HOST
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stale = False  # 健康检查失败后置位，下次使用时重新连接
+        self._in_use: Dict[httpx.AsyncClient, int] = {}  # 各客户端进行中的请求数
+        self._retired: Set[httpx.AsyncClient] = set()  # 已替换、待请求结束后关闭的客户端
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            url = urlparse(self.base_url)
+            if url.scheme in ("unix", "http+unix"):
+                # 兼容 unix://var/run/docker.sock 这种省略根目录斜杠的写法
+                socket_path = "/" + self.base_url.split("://", 1)[1].lstrip("/")
+                transport = httpx.AsyncHTTPTransport(uds=socket_path, retries=1)
+                base = "http://docker"
+            else:
+                transport = httpx.AsyncHTTPTransport(retries=1)
+                base = f"http://{url.netloc}"
+            self._client = httpx.AsyncClient(
+                transport=transport,
+                base_url=base,
+                timeout=settings.DOCKER_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.DOCKER_POOL_SIZE,
+                    max_keepalive_connections=settings.DOCKER_POOL_SIZE,
+                    keepalive_expiry=settings.DOCKER_KEEPALIVE
+                )
+            )
+        return self._client
+
+    async def _acquire(self) -> httpx.AsyncClient:
+        """
+        取得当前客户端并记录使用；已标记失效时先换用新客户端，旧客户端在其请求全部结束后关闭
+        """
+        if self._stale:
+            self._stale = False
+            if self._client is not None:
+                old, self._client = self._client, None
+                self._retired.add(old)
+                await self._close_if_idle(old)
+        client = self._get_client()
+        self._in_use[client] = self._in_use.get(client, 0) + 1
+        return client
+
+    async def _release(self, client: httpx.AsyncClient) -> None:
+        count = self._in_use.get(client, 1) - 1
+        if count > 0:
+            self._in_use[client] = count
+        else:
+            self._in_use.pop(client, None)
+            await self._close_if_idle(client)
+
+    async def _close_if_idle(self, client: httpx.AsyncClient) -> None:
+        if client in self._retired and not self._in_use.get(client):
+            self._retired.discard(client)
+            await client.aclose()
+
+    async def close(self) -> None:
+        clients = list(self._retired) + ([self._client] if self._client is not None else [])
+        self._client = None
+        self._retired.clear()
+        self._in_use.clear()
+        for client in clients:
+            await client.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[dict] = None,
+        json_body: Optional[dict] = None,
+        timeout: Union[float, httpx.Timeout, None] = None
+    ) -> httpx.Response:
+        client = await self._acquire()
+        try:
+            response = await client.request(
+                method,
+                path,
+                params=params,
+                json=json_body,
+                timeout=timeout if timeout is not None else settings.DOCKER_TIMEOUT
+            )
+        finally:
+            await self._release(client)
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            raise DockerAPIError(response.status_code, message)
+        return response
+
+    async def ping(self) -> bool:
+        """
+        健康检查，失败时标记客户端失效，下次请求时重新连接（不中断进行中的请求）
+        """
+        try:
+            response = await self._request("GET", "/_ping")
+            return response.text == "OK"
+        except Exception as e:
+            logger.warning(f"Docker health check failed: {str(e)}")
+            self._stale = True
+            return False
+
+    async def create_container(
+        self,
+        image_tag: str,
+        name: str,
+        ports: Dict[str, str] = None,
+        environment: Dict[str, str] = None,
+        instance_id: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        创建并启动容器（带平台管理标签）
+        """
+        try:
+            labels = {MANAGED_LABEL: "true"}
+            if instance_id is not None:
+                labels[INSTANCE_LABEL] = str(instance_id)
+            ports = ports or {}
+            body = {
+                "Image": image_tag,
+                "Env": [f"{key}={value}" for key, value in (environment or {}).items()],
+                "Labels": labels,
+                "ExposedPorts": {port: {} for port in ports},
+                "HostConfig": {
+                    "PortBindings": {
+                        port: [{"HostPort": str(host_port) if host_port is not None else ""}]
+                        for port, host_port in ports.items()
+                    }
+                }
+            }
+            response = await self._request("POST", "/containers/create", params={"name": name}, json_body=body)
+            container_id = response.json()["Id"]
+            await self._request("POST", f"/containers/{container_id}/start")
+            return container_id
+        except Exception as e:
+            logger.error(f"Error creating container: {str(e)}", exc_info=True)
+            return None
+
+    async def stop_container(self, container_id: str, timeout: Optional[int] = None) -> bool:
+        """
+        停止容器
+        """
+        try:
+            grace = timeout if timeout is not None else settings.DOCKER_STOP_TIMEOUT
+            await self._request(
+                "POST", f"/containers/{container_id}/stop",
+                params={"t": grace}, timeout=settings.DOCKER_TIMEOUT + grace
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error stopping container: {str(e)}", exc_info=True)
+            return False
+
+    async def restart_container(self, container_id: str, timeout: Optional[int] = None) -> bool:
+        """
+        重启容器
+        """
+        try:
+            grace = timeout if timeout is not None else settings.DOCKER_STOP_TIMEOUT
+            await self._request(
+                "POST", f"/containers/{container_id}/restart",
+                params={"t": grace}, timeout=settings.DOCKER_TIMEOUT + grace
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error restarting container: {str(e)}", exc_info=True)
+            return False
+
+    async def remove_container(self, container_id: str) -> bool:
+        """
+        删除容器，容器已不存在时视为成功
+        """
+        try:
+            await self._request("DELETE", f"/containers/{container_id}", params={"force": "true"})
+            return True
+        except DockerAPIError as e:
+            if e.status_code == 404:
+                return True
+            logger.error(f"Error removing container: {str(e)}", exc_info=True)
+            return False
+        except Exception as e:
+            logger.error(f"Error removing container: {str(e)}", exc_info=True)
+            return False
+
+    async def get_container_status(self, container_id: str) -> Optional[dict]:
+        """
+        获取容器状态信息
+        """
+        try:
+            attrs = (await self._request("GET", f"/containers/{container_id}/json")).json()
+            return {
+                "status": attrs["State"]["Status"],
+                "started_at": attrs["State"]["StartedAt"],
+                "platform": attrs.get("Platform"),
+                "image": attrs["Config"]["Image"],
+                "ports": attrs["NetworkSettings"].get("Ports") or {},
+                "network_settings": attrs["NetworkSettings"]["Networks"]
+            }
+        except DockerAPIError as e:
+            # 容器已被删除属于正常情况，不记录错误
+            if e.status_code != 404:
+                logger.error(f"Error getting container status: {str(e)}", exc_info=True)
+            return None
+        except Exception as e:
+            logger.error(f"Error getting container status: {str(e)}", exc_info=True)
+            return None
+
+    async def list_managed_containers(self) -> Optional[Dict[str, dict]]:
+        """
+        一次调用获取所有平台管理容器的摘要信息（按容器 ID 索引）
+        """
+        try:
+            filters = json.dumps({"label": [f"{MANAGED_LABEL}=true"]})
+            response = await self._request("GET", "/containers/json", params={"all": "true", "filters": filters})
+            return {c["Id"]: c for c in response.json()}
+        except Exception as e:
+            logger.error(f"Error listing containers: {str(e)}", exc_info=True)
+            return None
+
+    async def get_container_stats(self, container_id: str) -> Optional[dict]:
+        """
+        获取容器资源使用统计（单次采样）
+        """
+        try:
+            response = await self._request("GET", f"/containers/{container_id}/stats", params={"stream": "false"})
+            return parse_stats_sample(response.json())
+        except Exception as e:
+            logger.error(f"Error getting container stats: {str(e)}", exc_info=True)
+            return None
+
+    async def get_container_logs(self, container_id: str, tail: int = 100) -> Optional[str]:
+        """
+        获取容器日志
+        """
+        try:
+            response = await self._request(
+                "GET", f"/containers/{container_id}/logs",
+                params={"stdout": 1, "stderr": 1, "timestamps": 1, "tail": tail}
+            )
+            return b"".join(payload for _, payload in demux(response.content)).decode('utf-8')
+        except Exception as e:
+            logger.error(f"Error getting container logs: {str(e)}", exc_info=True)
+            return None
+
+    async def stream_container_logs(
+        self,
+        container_id: str,
+        follow: bool = False,
+        since: Optional[Union[float, str]] = None,
+        until: Optional[float] = None,
+        tail: Union[int, str] = "all",
+        stdout: bool = True,
+        stderr: bool = True
+    ) -> AsyncIterator[Tuple[str, bytes]]:
+        """
+        以流的形式读取容器日志（带时间戳），返回逐帧产出 (stdout/stderr, 数据) 的迭代器
+
+        容器不存在等错误在收到响应头后即以 DockerAPIError 抛出；迭代器关闭时释放连接
+        """
+        params = {
+            "stdout": int(stdout),
+            "stderr": int(stderr),
+            "timestamps": 1,
+            "follow": int(follow),
+            "tail": tail,
+        }
+        if since:
+            # 字符串形式的 since 为精确的 "秒.纳秒"，原样传递
+            params["since"] = since if isinstance(since, str) else f"{since:.9f}"
+        if until:
+            params["until"] = f"{until:.9f}"
+        client = await self._acquire()
+        try:
+            # follow 模式下不设置读取超时
+            timeout = httpx.Timeout(settings.DOCKER_TIMEOUT, read=None if follow else settings.DOCKER_TIMEOUT)
+            request = client.build_request("GET", f"/containers/{container_id}/logs", params=params, timeout=timeout)
+            response = await client.send(request, stream=True)
+            if response.status_code >= 400:
+                await response.aread()
+                await response.aclose()
+                raise DockerAPIError(response.status_code, response.text)
+        except BaseException:
+            await self._release(client)
+            raise
+
+        async def frames() -> AsyncIterator[Tuple[str, bytes]]:
+            try:
+                async for frame in ademux(response.aiter_bytes()):
+                    yield frame
+            finally:
+                await response.aclose()
+                await self._release(client)
+
+        return frames()
+
+    async def execute_command(self, container_id: str, cmd: str) -> Optional[tuple]:
+        """
+        在容器中执行命令
+        """
+        try:
+            response = await self._request(
+                "POST", f"/containers/{container_id}/exec",
+                json_body={"Cmd": shlex.split(cmd), "AttachStdout": True, "AttachStderr": True}
+            )
+            exec_id = response.json()["Id"]
+            response = await self._request(
+                "POST", f"/exec/{exec_id}/start",
+                json_body={"Detach": False, "Tty": False},
+                # 等待命令执行结束，不限制读取时间
+                timeout=httpx.Timeout(settings.DOCKER_TIMEOUT, read=None)
+            )
+            output = b"".join(payload for _, payload in demux(response.content))
+            inspect = (await self._request("GET", f"/exec/{exec_id}/json")).json()
+            return (inspect.get("ExitCode"), output.decode('utf-8'))
+        except Exception as e:
+            logger.error(f"Error executing command: {str(e)}", exc_info=True)
+            return None
+
+def _is_multiplexed(header: bytes) -> bool:
+    return len(header) == 8 and header[0] in STREAM_TYPES and header[1:4] == b"\0\0\0"
+
+def demux(data: bytes) -> List[Tuple[str, bytes]]:
+    """
+    拆分 Docker 多路复用流（8 字节帧头：流类型 + 3 字节保留 + 4 字节长度），
+    TTY 容器的原始流整体视为 stdout
+    """
+    if not _is_multiplexed(data[:8]):
+        return [("stdout", data)] if data else []
+    frames = []
+    offset = 0
+    while offset + 8 <= len(data):
+        stream_type, size = struct.unpack(">BxxxL", data[offset:offset + 8])
+        frames.append((STREAM_TYPES.get(stream_type, "stdout"), data[offset + 8:offset + 8 + size]))
+        offset += 8 + size
+    return frames
+
+async def ademux(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[str, bytes]]:
+    """
+    demux 的流式版本，只缓存未完整的一帧
+    """
+    buffer = b""
+    multiplexed = None
+    async for chunk in chunks:
+        buffer += chunk
+        if multiplexed is None:
+            if len(buffer) < 8:
+                continue
+            multiplexed = _is_multiplexed(buffer[:8])
+        if not multiplexed:
+            yield "stdout", buffer
+            buffer = b""
+            continue
+        while len(buffer) >= 8:
+            stream_type, size = struct.unpack(">BxxxL", buffer[:8])
+            if len(buffer) < 8 + size:
+                break
+            yield STREAM_TYPES.get(stream_type, "stdout"), buffer[8:8 + size]
+            buffer = buffer[8 + size:]
+    if buffer and not multiplexed:
+        yield "stdout", buffer
+
+async_docker = AsyncDockerClient()
@@ -0,0 +1,94 @@
+import os
+import threading
+import logging
+from typing import Dict, Optional
+import docker
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 普通请求与长时间操作（构建、事件流、统计流）分别使用独立的客户端，
+# 避免长连接占满普通请求的连接池，并允许设置不同的超时
+DEFAULT = "default"
+LONG = "long"
+
+class DockerClientManager:
+    """
+    懒加载的 Docker 客户端管理
+
+    首次使用时才连接守护进程，应用启动不再依赖 Docker 可用；
+    连接池大小与超时由配置决定，健康检查失败时标记客户端失效，下次使用时重新连接。
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, docker.DockerClient] = {}
+        self._lock = threading.Lock()
+
+    def _create(self, kind: str) -> docker.DockerClient:
+        timeout = settings.DOCKER_LONG_TIMEOUT if kind == LONG else settings.DOCKER_TIMEOUT
+        # DOCKER_HOST 以配置为准，TLS 等其余参数仍从环境变量读取
+        environment = {**os.environ, "DOCKER_HOST": settings.DOCKER_HOST}
+        return docker.from_env(
+            timeout=int(timeout),
+            max_pool_size=settings.DOCKER_POOL_SIZE,
+            environment=environment
+        )
+
+    def get(self, kind: str = DEFAULT) -> docker.DockerClient:
+        client = self._clients.get(kind)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(kind)
+            if client is None:
+                client = self._clients[kind] = self._create(kind)
+                logger.info(f"Docker client ({kind}) connected to {settings.DOCKER_HOST}")
+            return client
+
+    def invalidate(self) -> None:
+        """
+        丢弃当前客户端但不关闭：之后的调用重新连接，进行中的构建、事件流等仍使用原客户端，
+        结束后随对象释放关闭连接
+        """
+        with self._lock:
+            self._clients = {}
+
+    def reset(self) -> None:
+        """
+        关闭所有客户端（应用关闭时调用）
+        """
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def health_check(self) -> bool:
+        """
+        检查守护进程是否可用，失败时标记客户端失效，下次使用时重新连接
+        """
+        try:
+            return bool(self.get().api.ping())
+        except Exception as e:
+            logger.warning(f"Docker health check failed: {str(e)}")
+            self.invalidate()
+            return False
+
+docker_clients = DockerClientManager()
+
+def get_client() -> docker.DockerClient:
+    """
+    普通 Docker 操作使用的客户端
+    """
+    return docker_clients.get(DEFAULT)
+
+def get_long_client() -> docker.DockerClient:
+    """
+    构建及流式读取等长时间操作使用的客户端
+    """
+    return docker_clients.get(LONG)
+
+def health_check() -> bool:
+    return docker_clients.health_check()
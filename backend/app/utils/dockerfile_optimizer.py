@@ -0,0 +1,356 @@
+import re
+import shlex
+from typing import Dict, List, Optional
+
+# 只影响镜像元数据、不改变构建结果的指令，可移到阶段末尾以提高层缓存命中率
+METADATA_INSTRUCTIONS = ("LABEL", "EXPOSE")
+# 阶段末尾的启动相关指令，元数据指令移到这些指令之前
+TRAILING_INSTRUCTIONS = ("CMD", "ENTRYPOINT", "HEALTHCHECK", "STOPSIGNAL", "USER")
+
+# 会改变当前 shell 状态（工作目录、变量、选项、退出）的内建命令，其后的命令不能再合并进来
+STATEFUL_BUILTINS = ("cd", "pushd", "popd", "export", "set", "unset", "source", ".", "exit", "umask", "alias", "shopt", "trap")
+
+# 包管理器：识别安装命令及缓存清理命令
+PACKAGE_MANAGERS = {
+    "apt": {
+        "install": re.compile(r"\bapt(-get)?\s+(-\S+\s+)*install\b"),
+        "cleanup": "rm -rf /var/lib/apt/lists/*",
+        "cleaned": re.compile(r"/var/lib/apt/lists"),
+    },
+    "yum": {
+        "install": re.compile(r"\byum\s+(-\S+\s+)*install\b"),
+        "cleanup": "yum clean all && rm -rf /var/cache/yum",
+        "cleaned": re.compile(r"\byum\s+clean\s+all\b"),
+    },
+    "dnf": {
+        "install": re.compile(r"\bdnf\s+(-\S+\s+)*install\b"),
+        "cleanup": "dnf clean all",
+        "cleaned": re.compile(r"\bdnf\s+clean\s+all\b"),
+    },
+    "apk": {
+        "install": re.compile(r"\bapk\s+(-\S+\s+)*add\b"),
+        "cleanup": None,  # apk 通过 --no-cache 避免缓存
+        "cleaned": re.compile(r"--no-cache\b"),
+    },
+}
+
+class Instruction:
+    """
+    Dockerfile 中的一条指令（含续行），以及紧邻其上方的注释
+    """
+
+    def __init__(
+        self,
+        keyword: str,
+        args: str,
+        line: int,
+        raw: str,
+        comments: Optional[List[str]] = None,
+        blank_before: bool = False
+    ):
+        self.keyword = keyword
+        self.args = args
+        self.line = line
+        self.raw = raw
+        self.comments = comments or []
+        self.blank_before = blank_before  # 原文中上方是否有空行
+        self.modified = False
+
+    def is_shell_run(self) -> bool:
+        """
+        可安全合并的 RUN：shell 形式、无 --mount 等选项、无 heredoc、不以后台执行符结尾
+        """
+        args = self.args.strip()
+        return (
+            self.keyword == "RUN"
+            and not args.startswith("[")
+            and not args.startswith("--")
+            and "<<" not in args
+            and not re.search(r"(^|[^&])&$", args)
+        )
+
+    def render(self) -> str:
+        if not self.modified:
+            body = self.raw
+        elif self.keyword == "RUN":
+            body = "RUN " + " \\\n    && ".join(split_commands(self.args))
+        else:
+            body = f"{self.keyword} {self.args}"
+        return "\n".join(self.comments + [body])
+
+def parse(dockerfile: str) -> Dict[str, list]:
+    """
+    解析 Dockerfile，返回解析器指令（# syntax= 等）与指令列表；
+    续行合并为一条指令，注释归属于其下方的指令，文件末尾的注释单独保留
+    """
+    lines = dockerfile.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    directives: List[str] = []
+    instructions: List[Instruction] = []
+    comments: List[str] = []
+    blank = blank_before_comments = False
+    index = 0
+    header = True
+    while index < len(lines):
+        line = lines[index]
+        stripped = line.strip()
+        if header and re.match(r"#\s*(syntax|escape|check)\s*=", stripped, re.IGNORECASE):
+            directives.append(stripped)
+            index += 1
+            continue
+        header = False
+        if not stripped:
+            blank = True
+            index += 1
+            continue
+        if stripped.startswith("#"):
+            if not comments:
+                blank_before_comments, blank = blank, False
+            comments.append(stripped)
+            index += 1
+            continue
+
+        start = index
+        raw_lines = [line.rstrip()]
+        while raw_lines[-1].endswith("\\") and index + 1 < len(lines):
+            index += 1
+            # 续行中间的注释行由 Docker 忽略，这里同样跳过
+            if lines[index].strip().startswith("#"):
+                continue
+            raw_lines.append(lines[index].rstrip())
+        index += 1
+
+        joined = " ".join(part.rstrip("\\").strip() for part in raw_lines)
+        keyword, _, args = joined.partition(" ")
+        blank_before = blank_before_comments if comments else blank
+        instructions.append(
+            Instruction(keyword.upper(), args.strip(), start + 1, "\n".join(raw_lines), comments, blank_before)
+        )
+        comments = []
+        blank = False
+    return {"directives": directives, "instructions": instructions, "trailing_comments": comments}
+
+def split_commands(command: str) -> List[str]:
+    """
+    按引号之外的 && 拆分 shell 命令
+    """
+    parts = []
+    current = ""
+    quote = None
+    index = 0
+    while index < len(command):
+        char = command[index]
+        if quote:
+            if char == "\\" and quote == '"' and index + 1 < len(command):
+                current += command[index:index + 2]
+                index += 2
+                continue
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif command.startswith("&&", index):
+            parts.append(current.strip())
+            current = ""
+            index += 2
+            continue
+        current += char
+        index += 1
+    if current.strip():
+        parts.append(current.strip())
+    return [part for part in parts if part]
+
+def _has_list_operators(command: str) -> bool:
+    """
+    命令中是否含有引号之外的 ;、|| 或后台执行符 &；
+    这类命令接在 && 之后会改变执行语义，不能合并到前一条 RUN
+    """
+    quote = None
+    for index, char in enumerate(command):
+        if quote:
+            if char == quote:
+                quote = None
+            continue
+        if char in ("'", '"'):
+            quote = char
+        elif char == ";" or command.startswith("||", index):
+            return True
+        elif char == "&":
+            neighbours = command[index - 1:index] + command[index + 1:index + 2]
+            if not any(c in neighbours for c in "&<>"):
+                return True
+    return False
+
+def _changes_shell_state(command: str) -> bool:
+    """
+    命令是否改变后续命令的执行环境：状态类内建命令、单独的变量赋值、列表操作符；
+    这类 RUN 之后的指令合并进来会在不同的目录、变量或控制流下执行
+    """
+    if _has_list_operators(command):
+        return True
+    for part in split_commands(command):
+        words = part.split()
+        if not words:
+            continue
+        if words[0].lstrip("(") in STATEFUL_BUILTINS:
+            return True
+        if all(re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", word) for word in words):
+            return True
+    return False
+
+def _is_legacy_label(instruction: Instruction) -> bool:
+    """
+    旧式 LABEL key value（无等号），合并后会被解析为另一组键值，保持原样
+    """
+    if instruction.keyword != "LABEL":
+        return False
+    try:
+        words = shlex.split(instruction.args)
+    except ValueError:
+        return True
+    return not words or "=" not in words[0]
+
+def _references_variable(instruction: Instruction) -> bool:
+    """
+    指令是否引用 $VAR / ${VAR}；移过其后的 ARG/ENV 会改变变量展开结果，保持原位
+    """
+    return bool(re.search(r"\$(\{|[A-Za-z_])", instruction.args))
+
+def _stages(instructions: List[Instruction]) -> List[List[Instruction]]:
+    stages: List[List[Instruction]] = []
+    for instruction in instructions:
+        if instruction.keyword == "FROM" or not stages:
+            stages.append([])
+        stages[-1].append(instruction)
+    return stages
+
+def _merge_runs(stage: List[Instruction], changes: List[dict]) -> List[Instruction]:
+    """
+    合并连续的 RUN 指令，被合并指令上方的注释上移到合并后的指令之前
+    """
+    result: List[Instruction] = []
+    for instruction in stage:
+        previous = result[-1] if result else None
+        if (
+            previous is not None
+            and previous.is_shell_run()
+            and instruction.is_shell_run()
+            and not _changes_shell_state(previous.args)
+            and not _has_list_operators(instruction.args)
+        ):
+            # 重复的索引更新命令保留：之前的命令可能已清空索引或新增了软件源
+            previous.args = " && ".join(split_commands(previous.args) + split_commands(instruction.args))
+            previous.comments.extend(instruction.comments)
+            previous.modified = True
+            changes.append({
+                "rule": "merge_run",
+                "line": instruction.line,
+                "message": f"第 {instruction.line} 行的 RUN 指令已合并到第 {previous.line} 行，减少镜像层数"
+            })
+            continue
+        result.append(instruction)
+    return result
+
+def _clean_package_caches(stage: List[Instruction], changes: List[dict]) -> None:
+    """
+    在阶段内最后一条使用某包管理器安装软件的 RUN 末尾清理包缓存；
+    之后的 RUN 仍可能依赖索引，因此只处理最后一条
+    """
+    for name, pm in PACKAGE_MANAGERS.items():
+        runs = [i for i in stage if i.keyword == "RUN" and pm["install"].search(i.args)]
+        if not runs:
+            continue
+        last = runs[-1]
+        if not last.is_shell_run() or pm["cleaned"].search(last.args):
+            continue
+        if name == "apk":
+            commands = [
+                re.sub(r"\bapk\s+add\b", "apk add --no-cache", c, count=1) if pm["install"].search(c) else c
+                for c in split_commands(last.args)
+            ]
+        else:
+            commands = split_commands(last.args) + [pm["cleanup"]]
+        last.args = " && ".join(commands)
+        last.modified = True
+        changes.append({
+            "rule": "clean_package_cache",
+            "line": last.line,
+            "message": f"第 {last.line} 行安装软件后清理 {name} 缓存，减小镜像体积"
+        })
+
+def _move_metadata(stage: List[Instruction], changes: List[dict]) -> List[Instruction]:
+    """
+    将 LABEL/EXPOSE 移到阶段末尾（启动相关指令之前），同类指令合并为一条，
+    避免修改元数据导致其后所有层缓存失效；旧式 LABEL 及引用变量的指令保持原位
+    """
+    head, metadata, body = stage[:1], [], stage[1:]
+    rest = []
+    for instruction in body:
+        movable = (
+            instruction.keyword in METADATA_INSTRUCTIONS
+            and not _is_legacy_label(instruction)
+            and not _references_variable(instruction)
+        )
+        (metadata if movable else rest).append(instruction)
+    if not metadata:
+        return stage
+
+    tail_start = len(rest)
+    while tail_start > 0 and rest[tail_start - 1].keyword in TRAILING_INSTRUCTIONS:
+        tail_start -= 1
+    build_steps = rest[:tail_start]
+
+    # 位于某个构建步骤之前的元数据指令才需要移动
+    for instruction in metadata:
+        position = stage.index(instruction)
+        if any(stage.index(step) > position for step in build_steps):
+            changes.append({
+                "rule": "move_metadata",
+                "line": instruction.line,
+                "message": f"第 {instruction.line} 行的 {instruction.keyword} 移到构建步骤之后，避免修改元数据使后续层缓存失效"
+            })
+
+    merged: List[Instruction] = []
+    for keyword in METADATA_INSTRUCTIONS:
+        group = [i for i in metadata if i.keyword == keyword]
+        if not group:
+            continue
+        first = group[0]
+        if len(group) > 1:
+            first.args = " ".join(i.args for i in group)
+            first.comments = [c for i in group for c in i.comments]
+            first.modified = True
+            changes.append({
+                "rule": "merge_metadata",
+                "line": first.line,
+                "message": f"合并 {len(group)} 条 {keyword} 指令"
+            })
+        merged.append(first)
+
+    return head + rest[:tail_start] + merged + rest[tail_start:]
+
+def optimize(dockerfile: str) -> dict:
+    """
+    基于规则优化 Dockerfile：合并连续 RUN、清理包管理器缓存、将元数据指令移到阶段末尾
+
+    返回 {"dockerfile": 优化后的内容, "changes": [{"rule", "line", "message"}]}，
+    不改变构建语义；无可优化项时原样返回
+    """
+    parsed = parse(dockerfile)
+    changes: List[dict] = []
+    output: List[str] = list(parsed["directives"])
+    for stage in _stages(parsed["instructions"]):
+        stage = _merge_runs(stage, changes)
+        _clean_package_caches(stage, changes)
+        stage = _move_metadata(stage, changes)
+        for index, instruction in enumerate(stage):
+            # 阶段开始、带注释及原文中前有空行的指令前空一行
+            if output and (index == 0 or instruction.comments or instruction.blank_before):
+                output.append("")
+            output.append(instruction.render())
+    if parsed["trailing_comments"]:
+        output.append("")
+        output.extend(parsed["trailing_comments"])
+
+    if not changes:
+        return {"dockerfile": dockerfile, "changes": []}
+    return {"dockerfile": "\n".join(output) + "\n", "changes": changes}
@@ -0,0 +1,137 @@
+import copy
+from typing import Any, Dict, List, Tuple
+
+class JsonPatchError(Exception):
+    """
+    补丁操作无效或无法应用
+    """
+
+def parse_pointer(pointer: str) -> List[str]:
+    """
+    解析 JSON Pointer（RFC 6901），"" 表示整个文档
+    """
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer}")
+    return [part.replace("~1", "/").replace("~0", "~") for part in pointer[1:].split("/")]
+
+def _index(container: list, token: str, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {token}")
+    return index
+
+def _resolve(document: Any, tokens: List[str]) -> Tuple[Any, str]:
+    """
+    返回路径最后一级的父容器与键
+    """
+    parent = document
+    for token in tokens[:-1]:
+        if isinstance(parent, dict):
+            if token not in parent:
+                raise JsonPatchError(f"Path not found: {token}")
+            parent = parent[token]
+        elif isinstance(parent, list):
+            parent = parent[_index(parent, token, allow_end=False)]
+        else:
+            raise JsonPatchError(f"Path not found: {token}")
+    return parent, tokens[-1]
+
+def _get(document: Any, pointer: str) -> Any:
+    tokens = parse_pointer(pointer)
+    if not tokens:
+        return document
+    parent, key = _resolve(document, tokens)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: {pointer}")
+        return parent[key]
+    if isinstance(parent, list):
+        return parent[_index(parent, key, allow_end=False)]
+    raise JsonPatchError(f"Path not found: {pointer}")
+
+def _add(document: Any, pointer: str, value: Any) -> Any:
+    tokens = parse_pointer(pointer)
+    if not tokens:
+        return value
+    parent, key = _resolve(document, tokens)
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, key, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Path not found: {pointer}")
+    return document
+
+def _remove(document: Any, pointer: str) -> Tuple[Any, Any]:
+    tokens = parse_pointer(pointer)
+    if not tokens:
+        raise JsonPatchError("Cannot remove the whole document")
+    parent, key = _resolve(document, tokens)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: {pointer}")
+        return document, parent.pop(key)
+    if isinstance(parent, list):
+        return document, parent.pop(_index(parent, key, allow_end=False))
+    raise JsonPatchError(f"Path not found: {pointer}")
+
+def _equal(left: Any, right: Any) -> bool:
+    """
+    按 JSON 类型比较：布尔值与数字不相等，整数与浮点数按数值比较
+    """
+    if isinstance(left, bool) or isinstance(right, bool):
+        return isinstance(left, bool) and isinstance(right, bool) and left == right
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+        return left == right
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(_equal(left[key], right[key]) for key in left)
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(_equal(a, b) for a, b in zip(left, right))
+    return type(left) is type(right) and left == right
+
+def apply_patch(document: Any, operations: List[Dict[str, Any]]) -> Any:
+    """
+    按 RFC 6902 依次应用补丁操作（add/remove/replace/move/copy/test），返回新文档；
+    任一操作失败时抛出 JsonPatchError，原文档不受影响
+    """
+    document = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise JsonPatchError("Operation must be an object")
+        op = operation.get("op")
+        path = operation.get("path")
+        if not isinstance(path, str):
+            raise JsonPatchError("Operation is missing 'path'")
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise JsonPatchError(f"'{op}' operation is missing 'value'")
+        if op in ("move", "copy") and not isinstance(operation.get("from"), str):
+            raise JsonPatchError(f"'{op}' operation is missing 'from'")
+
+        if op == "add":
+            document = _add(document, path, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            document, _ = _remove(document, path)
+        elif op == "replace":
+            if parse_pointer(path):
+                document, _ = _remove(document, path)
+            document = _add(document, path, copy.deepcopy(operation["value"]))
+        elif op == "move":
+            source = operation["from"]
+            if path != source and path.startswith(source + "/"):
+                raise JsonPatchError("Cannot move a value into one of its children")
+            document, value = _remove(document, source)
+            document = _add(document, path, value)
+        elif op == "copy":
+            document = _add(document, path, copy.deepcopy(_get(document, operation["from"])))
+        elif op == "test":
+            if not _equal(_get(document, path), operation["value"]):
+                raise JsonPatchError(f"Test failed at {path}")
+        else:
+            raise JsonPatchError(f"Unsupported operation: {op}")
+    return document
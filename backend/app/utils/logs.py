@@ -0,0 +1,62 @@
+import base64
+import calendar
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+def parse_timestamp(value: str) -> Optional[int]:
+    """
+    解析 Docker 日志时间戳（RFC3339Nano，UTC），返回纳秒级 Unix 时间
+    """
+    try:
+        value = value.rstrip("Z")
+        base, _, fraction = value.partition(".")
+        seconds = calendar.timegm(time.strptime(base, "%Y-%m-%dT%H:%M:%S"))
+        return seconds * 1_000_000_000 + int((fraction or "0")[:9].ljust(9, "0"))
+    except ValueError:
+        return None
+
+def encode_cursor(nanos: int, seen: int) -> str:
+    """
+    日志游标：最后一行的时间戳以及该时间戳下已输出的行数
+    """
+    return base64.urlsafe_b64encode(f"{nanos}:{seen}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    nanos, _, seen = base64.urlsafe_b64decode(padded.encode()).decode().partition(":")
+    return int(nanos), int(seen or 0)
+
+async def iter_lines(frames: AsyncIterator[Tuple[str, bytes]]) -> AsyncIterator[Tuple[str, bytes]]:
+    """
+    将多路复用的日志帧按流（stdout/stderr）分别切分为行，每个流只缓存当前未结束的一行
+    """
+    pending: Dict[str, bytes] = {}
+    async for stream, chunk in frames:
+        *lines, pending[stream] = (pending.get(stream, b"") + chunk).split(b"\n")
+        for line in lines:
+            yield stream, line
+    for stream, line in pending.items():
+        if line:
+            yield stream, line
+
+async def iter_timestamped(
+    lines: AsyncIterator[Tuple[str, bytes]],
+    cursor: Optional[str] = None
+) -> AsyncIterator[Tuple[str, str, int, str]]:
+    """
+    解析带时间戳的日志行，返回 (流, 时间戳, 纳秒时间, 内容)；
+    指定游标时跳过游标之前（含）已输出的行
+    """
+    after, skip = decode_cursor(cursor) if cursor else (None, 0)
+    async for stream, raw in lines:
+        stamp, _, text = raw.decode("utf-8", errors="replace").partition(" ")
+        nanos = parse_timestamp(stamp)
+        if nanos is None:
+            continue
+        if after is not None:
+            if nanos < after:
+                continue
+            if nanos == after and skip > 0:
+                skip -= 1
+                continue
+        yield stream, stamp, nanos, text.rstrip("\r")
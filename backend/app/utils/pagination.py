@@ -0,0 +1,133 @@
+import json
+import time
+import base64
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Query
+from app.core.config import settings
+
+COUNT_CACHE_SIZE = 256  # 缓存的总数查询条数
+
+def encode_cursor(payload: dict) -> str:
+    """
+    不透明游标：JSON 后 base64url 编码
+    """
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    if not isinstance(payload, dict):
+        raise ValueError("cursor payload must be an object")
+    return payload
+
+def _parse(cursor: str, keyset: bool):
+    try:
+        payload = decode_cursor(cursor)
+        if keyset:
+            return datetime.fromisoformat(payload["k"][0]), int(payload["k"][1])
+        return int(payload["o"])
+    except (ValueError, KeyError, IndexError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def seek(query: Query, model, cursor: Optional[str] = None, descending: bool = False) -> Query:
+    """
+    按 (created_at, id) 排序，并定位到键集游标之后
+    """
+    order = (model.created_at.desc(), model.id.desc()) if descending else (model.created_at, model.id)
+    query = query.order_by(*order)
+    if not cursor:
+        return query
+    created_at, last_id = _parse(cursor, keyset=True)
+    # 优先用游标记录在库中的 created_at 比较，避免不同写入方式的时间格式差异
+    anchor = func.coalesce(
+        select(model.created_at).where(model.id == last_id).scalar_subquery(),
+        created_at
+    )
+    position = tuple_(model.created_at, model.id)
+    boundary = tuple_(anchor, last_id)
+    return query.filter(position < boundary if descending else position > boundary)
+
+def paginate(
+    query: Query,
+    model,
+    *,
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    keyset: bool = True
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    按 (created_at, id) 排序分页，返回 (本页记录, 下一页游标)，没有下一页时游标为 None
+
+    - 指定 cursor 时从游标之后继续（键集分页，与页码深度无关），忽略 skip
+    - 未指定 cursor 时按 skip/limit 返回，兼容原有的偏移分页
+    - keyset 为 False（查询已有其他排序，如按搜索相关度）时游标记录偏移量
+    """
+    if keyset:
+        query = seek(query, model, cursor, descending)
+        offset = 0 if cursor else skip
+    else:
+        query = seek(query, model, descending=descending)
+        offset = _parse(cursor, keyset=False) if cursor else skip
+
+    if limit <= 0:
+        return [], None
+    rows = query.offset(offset).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, next_cursor(rows[-1], offset + limit, keyset)
+
+def next_cursor(last: Any, offset: int, keyset: bool = True) -> str:
+    """
+    指向 last 之后的游标
+    """
+    if keyset:
+        return encode_cursor({"k": [last.created_at.isoformat(), last.id]})
+    return encode_cursor({"o": offset})
+
+class CountCache:
+    """
+    总数查询缓存：相同的查询（SQL 与参数）在 PAGINATION_COUNT_TTL 秒内复用结果，
+    返回的是近似值，新增或删除的记录在缓存过期后才反映到总数中
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[tuple, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, query: Query) -> int:
+        statement = query.order_by(None).statement.compile()
+        key = (str(statement), tuple(sorted((k, repr(v)) for k, v in statement.params.items())))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+        # 直接 count(*)，避免 Query.count() 包一层读取全部列的子查询
+        entity = query.column_descriptions[0]["entity"]
+        total = query.order_by(None).with_entities(func.count(entity.id)).scalar()
+        with self._lock:
+            self._entries[key] = (now + settings.PAGINATION_COUNT_TTL, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > COUNT_CACHE_SIZE:
+                self._entries.popitem(last=False)
+        return total
+
+count_cache = CountCache()
+
+def set_page_headers(response: Response, cursor: Optional[str], total: Optional[int] = None) -> None:
+    """
+    通过响应头返回下一页游标与总数，列表响应体保持不变
+    """
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
@@ -0,0 +1,104 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class _Broadcast:
+    """
+    单个上游流的广播：生产任务读取上游并保存全部片段，每个订阅者从头依次读取，
+    因此晚加入的订阅者也会收到完整且相同的片段序列
+    """
+
+    def __init__(self, source: AsyncIterator[str], on_done: Callable[["_Broadcast"], None]):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._changed = asyncio.Condition()
+        self._on_done = on_done
+        self._task = asyncio.ensure_future(self._run(source))
+
+    async def _run(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                async with self._changed:
+                    self.chunks.append(chunk)
+                    self._changed.notify_all()
+        except asyncio.CancelledError:
+            # 订阅者收到普通异常，由调用方的 except Exception 处理
+            self.error = RuntimeError("upstream cancelled")
+        except Exception as e:
+            self.error = e
+        finally:
+            await source.aclose()
+            self._on_done(self)
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                async with self._changed:
+                    while index >= len(self.chunks) and not self.done:
+                        await self._changed.wait()
+                    chunks, index = self.chunks[index:], len(self.chunks)
+                    done = self.done and index >= len(self.chunks)
+                for chunk in chunks:
+                    yield chunk
+                if done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+        finally:
+            self.subscribers -= 1
+            # 所有订阅者都已离开时取消上游请求；先从注册表移除，之后的调用方会启动新的上游
+            if self.subscribers == 0 and not self.done:
+                self._on_done(self)
+                self._task.cancel()
+
+class SingleFlight:
+    """
+    合并相同键的并发调用：同一时刻只执行一次，结果（或流）分发给所有调用方
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行 fn 或等待已在执行的相同调用；单个调用方被取消不会影响其他调用方
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda finished: self._release(self._calls, key, finished))
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        订阅 fn 产生的流，相同键的并发订阅者共享一个上游流；
+        开始迭代时才加入（或启动）上游，未被迭代的订阅不会启动上游请求
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = self._streams[key] = _Broadcast(
+                fn(), lambda finished: self._release(self._streams, key, finished)
+            )
+        subscription = broadcast.subscribe()
+        try:
+            async for chunk in subscription:
+                yield chunk
+        finally:
+            await subscription.aclose()
+
+    def inflight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    @staticmethod
+    def _release(registry: dict, key: str, value) -> None:
+        if registry.get(key) is value:
+            registry.pop(key, None)
@@ -0,0 +1,20 @@
+from typing import Optional, Union
+
+def format_sse(data: str, event: Optional[str] = None, id: Optional[Union[int, str]] = None) -> str:
+    """
+    按 Server-Sent Events 格式编码一条消息
+    """
+    message = ""
+    if id is not None:
+        message += f"id: {id}\n"
+    if event is not None:
+        message += f"event: {event}\n"
+    for line in data.split("\n"):
+        message += f"data: {line}\n"
+    return message + "\n"
+
+def sse_comment(text: str = "keep-alive") -> str:
+    """
+    SSE 注释行，用于保持连接
+    """
+    return f": {text}\n\n"
@@ -0,0 +1,62 @@
+import time
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+class RingSeries:
+    """
+    固定容量的列式环形缓冲区
+
+    每个字段一列 array('d')，容量满后覆盖最旧的样本，内存占用恒定。
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int):
+        self.fields = tuple(fields)
+        self.capacity = max(1, capacity)
+        self._timestamps = array('d', bytes(8 * self.capacity))
+        self._columns = {field: array('d', bytes(8 * self.capacity)) for field in self.fields}
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, values: Dict[str, float], timestamp: Optional[float] = None) -> None:
+        """
+        追加一个样本，缺失的字段记为 0
+        """
+        with self._lock:
+            index = self._next
+            self._timestamps[index] = timestamp if timestamp is not None else time.time()
+            for field, column in self._columns.items():
+                column[index] = values.get(field, 0.0)
+            self._next = (index + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        """
+        最新样本
+        """
+        with self._lock:
+            if not self._size:
+                return None
+            index = (self._next - 1) % self.capacity
+            sample = {field: column[index] for field, column in self._columns.items()}
+            sample["timestamp"] = self._timestamps[index]
+            return sample
+
+    def window(self, seconds: Optional[float] = None) -> Dict[str, List[float]]:
+        """
+        按时间顺序返回最近 seconds 秒内的样本（列式），seconds 为空时返回全部
+        """
+        with self._lock:
+            start = (self._next - self._size) % self.capacity
+            indexes = [(start + i) % self.capacity for i in range(self._size)]
+            if seconds is not None:
+                cutoff = time.time() - seconds
+                indexes = [i for i in indexes if self._timestamps[i] >= cutoff]
+            result = {"timestamp": [self._timestamps[i] for i in indexes]}
+            for field, column in self._columns.items():
+                result[field] = [column[i] for i in indexes]
+            return result
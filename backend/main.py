@@ -6,8 +6,18 @@ from app.core.config import settings
 from app.api import auth, images, software, targets, instances, dashboard, ai, scenes
 from app.models.user import Base
 from app.db.session import engine
+from app.db.search import search_index
+from app.db.migrations import run_migrations
 from app.db.init_db import init_db
 from app.db.session import SessionLocal
+from app.services.job_service import job_queue
+from app.services.container_state import state_cache
+from app.services.stats_collector import stats_collector
+from app.services.system_metrics import system_metrics
+from app.utils.docker_async import async_docker
+from app.services.llm_client import llm_client
+from app.utils.docker_client import docker_clients, health_check
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 import logging
 
@@ -23,6 +33,8 @@ logger = logging.getLogger(__name__)
 try:
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created successfully")
+    run_migrations(engine)
+    search_index.ensure(engine)
 except Exception as e:
     logger.error(f"Error creating database tables: {e}")
 
@@ -73,6 +85,39 @@ try:
 except Exception as e:
     logger.error(f"Error initializing database: {e}")
 
+# 启动/停止后台任务
+@app.on_event("startup")
+def start_background_services():
+    job_queue.start()
+    state_cache.start()
+    stats_collector.start()
+    system_metrics.start()
+
+@app.on_event("shutdown")
+def stop_background_services():
+    system_metrics.stop()
+    stats_collector.stop()
+    state_cache.stop()
+    job_queue.stop()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await async_docker.close()
+    await llm_client.close()
+    docker_clients.reset()
+
+@app.get(f"{settings.API_V1_STR}/health", tags=["health"])
+async def health():
+    """
+    服务健康检查（Docker 守护进程连通性）
+    """
+    docker_ok = await run_in_threadpool(health_check)
+    docker_async_ok = await async_docker.ping()
+    return {
+        "status": "ok" if docker_ok and docker_async_ok else "degraded",
+        "docker": docker_ok and docker_async_ok
+    }
+
 # 设置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -80,6 +125,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # 挂载静态文件
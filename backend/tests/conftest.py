@@ -0,0 +1,5 @@
+import os
+
+# 必填配置项在测试中使用占位值，避免导入 app.core.config 时校验失败
+os.environ.setdefault("BAILIAN_API_KEY", "test")
+os.environ.setdefault("API_BASE_URL", "http://localhost")
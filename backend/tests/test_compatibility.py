@@ -0,0 +1,63 @@
+from app.services.compatibility import check_compatibility, normalize_arch, normalize_port, package_managers
+
+IMAGE = {"name": "ubuntu:22.04", "architecture": "amd64"}
+
+
+def _software(id, **fields):
+    return {"id": id, "name": f"s{id}", "version": "1", "architecture": "amd64", "os_type": "linux", **fields}
+
+
+def test_package_names_are_not_package_managers():
+    assert package_managers("apt-get install -y rpm yum-utils") == ["apt-get"]
+    assert package_managers("echo apk add curl") == []
+
+
+def test_package_managers_in_command_position():
+    command = "sudo -E DEBIAN_FRONTEND=noninteractive apt-get update && yum install -y x | tee log; (/sbin/apk add y)"
+    assert package_managers(command) == ["apt-get", "yum", "apk"]
+
+
+def test_installing_package_named_like_manager_is_compatible():
+    report = check_compatibility(IMAGE, [_software(1, install_command="apt-get install -y rpm")])
+    assert report["compatible"]
+    assert report["findings"] == []
+
+
+def test_foreign_package_manager_is_reported():
+    report = check_compatibility(IMAGE, [_software(1, install_command="yum install -y httpd")])
+    assert [f["rule"] for f in report["findings"]] == ["package_manager"]
+
+
+def test_normalize_port():
+    assert normalize_port(80) == normalize_port("80") == normalize_port("80/TCP") == (80, "tcp")
+    assert normalize_port("53/udp") == (53, "udp")
+    assert normalize_port("http") is None
+    assert normalize_port(70000) is None
+
+
+def test_port_conflict_across_notations():
+    report = check_compatibility(IMAGE, [
+        _software(1, ports=[80]),
+        _software(2, ports=["80/tcp"]),
+        _software(3, ports=["80/udp"]),
+    ])
+    conflicts = [f for f in report["findings"] if f["rule"] == "port_conflict"]
+    assert [f["software_ids"] for f in conflicts] == [[1, 2]]
+
+
+def test_normalize_arch():
+    assert normalize_arch("x86_64") == normalize_arch("linux/amd64") == "amd64"
+    assert normalize_arch("aarch64") == normalize_arch("arm64") == "arm64"
+    assert normalize_arch("armv7l") == "arm/v7"
+    assert normalize_arch("i686") == "386"
+    assert normalize_arch("sparc") is None
+
+
+def test_arm64_software_on_armv7_image_is_incompatible():
+    report = check_compatibility({**IMAGE, "architecture": "armv7"}, [_software(1, architecture="arm64")])
+    assert [f["rule"] for f in report["findings"]] == ["architecture"]
+
+
+def test_i386_software_on_amd64_image_is_incompatible():
+    report = check_compatibility(IMAGE, [_software(1, architecture="i386")])
+    assert [f["rule"] for f in report["findings"]] == ["architecture"]
@@ -0,0 +1,21 @@
+import logging
+
+import docker as docker_sdk
+
+from app.utils import docker
+
+
+class _Containers:
+    def get(self, container_id):
+        raise docker_sdk.errors.NotFound("No such container")
+
+
+class _Client:
+    containers = _Containers()
+
+
+def test_missing_container_is_not_logged_as_error(monkeypatch, caplog):
+    monkeypatch.setattr(docker, "get_client", lambda: _Client())
+    with caplog.at_level(logging.ERROR):
+        assert docker.get_container_status("gone") is None
+    assert caplog.records == []
@@ -0,0 +1,104 @@
+from app.utils.dockerfile_optimizer import optimize
+
+
+def _rules(result):
+    return [change["rule"] for change in result["changes"]]
+
+
+def test_merges_consecutive_runs():
+    result = optimize("FROM alpine\nRUN echo a\nRUN echo b\n")
+    assert "RUN echo a \\\n    && echo b" in result["dockerfile"]
+    assert _rules(result) == ["merge_run"]
+
+
+def test_keeps_repeated_index_update_when_merging():
+    result = optimize(
+        "FROM debian\n"
+        "RUN apt-get update && apt-get install -y curl && rm -rf /var/lib/apt/lists/*\n"
+        "RUN apt-get update && apt-get install -y nginx\n"
+    )
+    assert "rm -rf /var/lib/apt/lists/* \\\n    && apt-get update \\\n    && apt-get install -y nginx" in result["dockerfile"]
+
+
+def test_does_not_merge_after_cd():
+    dockerfile = "FROM alpine\nRUN cd /opt && make\nRUN ./configure\n"
+    assert optimize(dockerfile) == {"dockerfile": dockerfile, "changes": []}
+
+
+def test_does_not_merge_after_export():
+    dockerfile = "FROM alpine\nRUN export FOO=1\nRUN echo $FOO\n"
+    assert optimize(dockerfile)["changes"] == []
+
+
+def test_does_not_merge_after_bare_assignment():
+    dockerfile = "FROM alpine\nRUN FOO=1\nRUN echo $FOO\n"
+    assert optimize(dockerfile)["changes"] == []
+
+
+def test_does_not_merge_after_list_operator():
+    dockerfile = "FROM alpine\nRUN test -f /x || exit 0\nRUN echo hi\n"
+    assert optimize(dockerfile)["changes"] == []
+
+
+def test_does_not_merge_run_with_list_operator():
+    dockerfile = "FROM alpine\nRUN echo a\nRUN echo b; echo c\n"
+    assert optimize(dockerfile)["changes"] == []
+
+
+def test_merges_stateful_run_into_previous():
+    result = optimize("FROM alpine\nRUN echo a\nRUN cd /opt && make\nRUN echo b\n")
+    assert "RUN echo a \\\n    && cd /opt \\\n    && make\n" in result["dockerfile"]
+    assert "\nRUN echo b" in result["dockerfile"]
+
+
+def test_does_not_merge_exec_form():
+    dockerfile = 'FROM alpine\nRUN ["echo", "a"]\nRUN echo b\n'
+    assert optimize(dockerfile)["changes"] == []
+
+
+def test_cleans_apt_cache_in_last_install():
+    result = optimize("FROM debian\nRUN apt-get update && apt-get install -y curl\n")
+    assert result["dockerfile"].rstrip().endswith("rm -rf /var/lib/apt/lists/*")
+    assert _rules(result) == ["clean_package_cache"]
+
+
+def test_apk_uses_no_cache():
+    result = optimize("FROM alpine\nRUN apk add curl\n")
+    assert "apk add --no-cache curl" in result["dockerfile"]
+
+
+def test_keeps_existing_cache_cleanup():
+    dockerfile = "FROM alpine\nRUN apk add --no-cache curl\n"
+    assert optimize(dockerfile)["changes"] == []
+
+
+def test_moves_and_merges_labels():
+    result = optimize("FROM alpine\nLABEL a=1\nRUN echo a\nLABEL b=2\nCMD [\"sh\"]\n")
+    lines = result["dockerfile"].strip().split("\n")
+    assert lines[-2:] == ["LABEL a=1 b=2", 'CMD ["sh"]']
+    assert set(_rules(result)) == {"move_metadata", "merge_metadata"}
+
+
+def test_leaves_legacy_label_in_place():
+    result = optimize("FROM alpine\nLABEL maintainer Foo\nLABEL b=2\nRUN echo a\n")
+    assert "LABEL maintainer Foo\n" in result["dockerfile"]
+    assert "LABEL maintainer Foo b=2" not in result["dockerfile"]
+    assert result["dockerfile"].index("LABEL maintainer Foo") < result["dockerfile"].index("RUN echo a")
+
+
+def test_leaves_label_referencing_variable_in_place():
+    result = optimize("FROM alpine\nARG V=1\nLABEL version=$V\nLABEL a=1\nENV V=2\nRUN echo a\n")
+    dockerfile = result["dockerfile"]
+    assert dockerfile.index("LABEL version=$V") < dockerfile.index("ENV V=2")
+    assert dockerfile.index("LABEL a=1") > dockerfile.index("RUN echo a")
+
+
+def test_keeps_comments_and_parser_directives():
+    result = optimize("# syntax=docker/dockerfile:1\nFROM alpine\n# first\nRUN echo a\n# second\nRUN echo b\n")
+    assert result["dockerfile"].startswith("# syntax=docker/dockerfile:1\n")
+    assert "# first\n# second\nRUN echo a" in result["dockerfile"]
+
+
+def test_returns_input_without_changes():
+    dockerfile = "FROM alpine\nCMD [\"sh\"]\n"
+    assert optimize(dockerfile) == {"dockerfile": dockerfile, "changes": []}
@@ -0,0 +1,34 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import Base
+from app.models.instance import Instance
+from app.models.job import Job
+from app.services.job_service import JobQueue, delete_jobs, enqueue
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_delete_jobs_removes_only_given_instances():
+    db = _session()
+    kept, deleted = Instance(name="kept"), Instance(name="deleted")
+    db.add_all([kept, deleted])
+    db.flush()
+    enqueue(db, "build", kept.id)
+    enqueue(db, "build", deleted.id)
+    enqueue(db, "start", deleted.id)
+    db.commit()
+
+    delete_jobs(db, [deleted.id])
+    db.delete(deleted)
+    db.commit()
+
+    assert [job.instance_id for job in db.query(Job).all()] == [kept.id]
+
+
+def test_worker_ids_differ_between_processes_with_same_pid():
+    assert JobQueue().worker_id != JobQueue().worker_id
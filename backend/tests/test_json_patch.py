@@ -0,0 +1,104 @@
+import pytest
+
+from app.utils.json_patch import JsonPatchError, apply_patch, parse_pointer
+
+
+def _topology():
+    return {
+        "nodes": [{"id": "a", "x": 1}, {"id": "b", "x": 2}],
+        "edges": [{"id": "e1", "source": "a", "target": "b"}],
+        "groups": [],
+    }
+
+
+def test_parse_pointer_unescapes_tokens():
+    assert parse_pointer("") == []
+    assert parse_pointer("/a~1b/c~0d/0") == ["a/b", "c~d", "0"]
+
+
+def test_parse_pointer_requires_leading_slash():
+    with pytest.raises(JsonPatchError):
+        parse_pointer("nodes/0")
+
+
+def test_add_appends_and_inserts():
+    result = apply_patch(_topology(), [
+        {"op": "add", "path": "/nodes/-", "value": {"id": "c"}},
+        {"op": "add", "path": "/nodes/0", "value": {"id": "z"}},
+    ])
+    assert [node["id"] for node in result["nodes"]] == ["z", "a", "b", "c"]
+
+
+def test_add_sets_object_member():
+    result = apply_patch(_topology(), [{"op": "add", "path": "/nodes/0/label", "value": "web"}])
+    assert result["nodes"][0]["label"] == "web"
+
+
+def test_remove_and_replace():
+    result = apply_patch(_topology(), [
+        {"op": "remove", "path": "/nodes/0"},
+        {"op": "replace", "path": "/nodes/0/x", "value": 5},
+    ])
+    assert result["nodes"] == [{"id": "b", "x": 5}]
+
+
+def test_replace_root():
+    assert apply_patch(_topology(), [{"op": "replace", "path": "", "value": {"nodes": []}}]) == {"nodes": []}
+
+
+def test_move_and_copy():
+    result = apply_patch(_topology(), [
+        {"op": "move", "from": "/nodes/1", "path": "/nodes/0"},
+        {"op": "copy", "from": "/nodes/0", "path": "/groups/-"},
+    ])
+    assert [node["id"] for node in result["nodes"]] == ["b", "a"]
+    assert result["groups"] == [{"id": "b", "x": 2}]
+
+
+def test_move_into_own_child_is_rejected():
+    with pytest.raises(JsonPatchError):
+        apply_patch(_topology(), [{"op": "move", "from": "/nodes", "path": "/nodes/0"}])
+
+
+def test_test_operation():
+    apply_patch(_topology(), [{"op": "test", "path": "/nodes/0", "value": {"id": "a", "x": 1.0}}])
+    with pytest.raises(JsonPatchError):
+        apply_patch(_topology(), [{"op": "test", "path": "/nodes/0/x", "value": 2}])
+
+
+def test_test_operation_compares_json_types():
+    document = {"flag": True, "count": 1, "items": [1]}
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, [{"op": "test", "path": "/flag", "value": 1}])
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, [{"op": "test", "path": "/count", "value": True}])
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, [{"op": "test", "path": "/items", "value": [True]}])
+    apply_patch(document, [{"op": "test", "path": "/flag", "value": True}])
+
+
+@pytest.mark.parametrize("operation", [
+    {"op": "remove", "path": "/nodes/5"},
+    {"op": "remove", "path": "/missing"},
+    {"op": "add", "path": "/nodes/01", "value": {}},
+    {"op": "add", "path": "/nodes/0"},
+    {"op": "replace", "path": "/missing/x", "value": 1},
+    {"op": "move", "path": "/groups/-"},
+    {"op": "remove", "path": ""},
+    {"op": "frobnicate", "path": "/nodes"},
+    {"path": "/nodes"},
+    "not an object",
+])
+def test_invalid_operations(operation):
+    with pytest.raises(JsonPatchError):
+        apply_patch(_topology(), [operation])
+
+
+def test_failed_patch_leaves_document_unchanged():
+    document = _topology()
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, [
+            {"op": "remove", "path": "/nodes/0"},
+            {"op": "remove", "path": "/nodes/9"},
+        ])
+    assert document == _topology()
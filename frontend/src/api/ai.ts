@@ -23,6 +23,7 @@ interface GenerateDescriptionRequest {
 
 interface OptimizeDockerfileRequest {
   dockerfile: string;
+  deep?: boolean;
 }
 
 interface CompatibilityCheckRequest {
@@ -74,10 +75,11 @@ export const generateDescription = async (data: GenerateDescriptionRequest): Pro
   }
 }
 
-export const optimizeDockerfile = async (dockerfile: string): Promise<any> => {
+export const optimizeDockerfile = async (dockerfile: string, deep = false): Promise<any> => {
   try {
     const request_data: OptimizeDockerfileRequest = {
-      dockerfile: dockerfile
+      dockerfile: dockerfile,
+      deep: deep
     }
     
     const response = await request({
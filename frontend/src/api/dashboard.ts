@@ -12,6 +12,17 @@ export interface ResourceUsage {
   cpuUsage: number
   memoryUsage: number
   diskUsage: number
+  load1?: number
+  load5?: number
+  load15?: number
+}
+
+export interface ResourceHistory {
+  timestamps: number[]
+  cpuUsage: number[]
+  memoryUsage: number[]
+  diskUsage: number[]
+  load1: number[]
 }
 
 export interface DashboardStats {
@@ -21,11 +32,14 @@ export interface DashboardStats {
   totalSoftware: number
   recentActivities: Activity[]
   resourceUsage: ResourceUsage
+  resourceHistory?: ResourceHistory
 }
 
-export const getDashboardStats = () => {
+// history: 同时获取最近 history 秒内的主机资源序列
+export const getDashboardStats = (history?: number) => {
   return request<DashboardStats>({
     url: getApiUrl('/dashboard/stats'),
-    method: 'get'
+    method: 'get',
+    params: history ? { history } : undefined
   })
 } 
\ No newline at end of file
@@ -1,6 +1,7 @@
 import request from '@/utils/request'
 import { getApiUrl } from '@/utils/request'
 import type { Scene, SceneCreate, SceneUpdate, SceneSearchParams, SceneList } from '@/types/scene'
+import type { PatchOperation } from '@/utils/json-patch'
 
 // 获取场景列表
 export const getScenes = (params: SceneSearchParams = {}) => {
@@ -37,6 +38,15 @@ export const updateScene = (id: number, data: Partial<Scene>) => {
   })
 }
 
+// 增量更新场景拓扑，version 与服务端不一致时返回 409
+export const patchSceneTopology = (id: number, version: number, operations: PatchOperation[]) => {
+  return request<{ version: number; node_count: number }>({
+    url: getApiUrl(`/scenes/${id}/topology`),
+    method: 'patch',
+    data: { version, operations }
+  })
+}
+
 // 删除场景
 export const deleteScene = (id: number) => {
   return request<void>({
@@ -280,6 +280,8 @@ export default {
       messages: {
         saveSuccess: 'Save successful',
         saveFailed: 'Save failed',
+        saveConflict: 'The topology was changed by someone else. Overwrite it with your version?',
+        overwrite: 'Overwrite',
         deleteNode: 'Are you sure to delete this node?',
         deleteEdge: 'Are you sure to delete this edge?',
         invalidConnection: 'Invalid connection',
@@ -274,6 +274,8 @@ export default {
       messages: {
         saveSuccess: '保存しました',
         saveFailed: '保存に失敗しました',
+        saveConflict: 'トポロジーは他のユーザーによって変更されています。現在の内容で上書きしますか？',
+        overwrite: '上書き',
         deleteNode: 'このノードを削除してもよろしいですか？',
         deleteEdge: 'このエッジを削除してもよろしいですか？',
         invalidConnection: '無効な接続です',
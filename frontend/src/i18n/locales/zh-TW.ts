@@ -281,6 +281,8 @@ export default {
       messages: {
         saveSuccess: '保存成功',
         saveFailed: '保存失敗',
+        saveConflict: '拓撲已被他人修改，是否以目前內容覆蓋？',
+        overwrite: '覆蓋',
         deleteNode: '確定要刪除該節點嗎？',
         deleteEdge: '確定要刪除該連接嗎？',
         invalidConnection: '無效的連接',
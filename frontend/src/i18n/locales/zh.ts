@@ -282,6 +282,8 @@ export default {
       messages: {
         saveSuccess: '保存成功',
         saveFailed: '保存失败',
+        saveConflict: '拓扑已被他人修改，是否用当前内容覆盖？',
+        overwrite: '覆盖',
         deleteNode: '确定要删除该节点吗？',
         deleteEdge: '确定要删除该连接吗？',
         invalidConnection: '无效的连接',
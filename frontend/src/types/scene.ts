@@ -4,6 +4,7 @@ export interface Scene {
   description: string;
   node_count: number;
   topology?: string;
+  topology_version?: number;
   created_at: string;
   updated_at: string;
   created_by_id: number;
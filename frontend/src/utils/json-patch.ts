@@ -0,0 +1,109 @@
+// JSON Patch（RFC 6902）操作
+export interface PatchOperation {
+  op: 'add' | 'remove' | 'replace' | 'move' | 'copy' | 'test'
+  path: string
+  value?: any
+  from?: string
+}
+
+const escapeToken = (token: string | number) =>
+  String(token).replace(/~/g, '~0').replace(/\//g, '~1')
+
+const isObject = (value: any) =>
+  value !== null && typeof value === 'object' && !Array.isArray(value)
+
+// 值为 undefined 的键在 JSON 序列化时会被丢弃，比较时视为不存在
+const definedKeys = (value: Record<string, any>) =>
+  Object.keys(value).filter(key => value[key] !== undefined)
+
+// 数组元素都是带唯一 id 的对象时按 id 对齐比较
+const keyOf = (items: any[]): string[] | null => {
+  const ids = items.map(item => (isObject(item) && item.id !== undefined ? String(item.id) : null))
+  if (ids.some(id => id === null) || new Set(ids).size !== ids.length) return null
+  return ids as string[]
+}
+
+const diffKeyed = (source: any[], target: any[], sourceIds: string[], targetIds: string[], path: string): PatchOperation[] => {
+  const operations: PatchOperation[] = []
+  const wanted = new Set(targetIds)
+  const items = [...source]
+  const ids = [...sourceIds]
+
+  // 先从后往前删除目标中不存在的元素，避免下标偏移
+  for (let i = ids.length - 1; i >= 0; i--) {
+    if (!wanted.has(ids[i])) {
+      operations.push({ op: 'remove', path: `${path}/${i}` })
+      items.splice(i, 1)
+      ids.splice(i, 1)
+    }
+  }
+
+  // 再按目标顺序逐个对齐：位置不同的元素移动过来，新元素插入
+  targetIds.forEach((id, i) => {
+    if (ids[i] !== id) {
+      const from = ids.indexOf(id, i)
+      if (from === -1) {
+        operations.push({ op: 'add', path: `${path}/${i}`, value: target[i] })
+        items.splice(i, 0, target[i])
+        ids.splice(i, 0, id)
+        return
+      }
+      operations.push({ op: 'move', from: `${path}/${from}`, path: `${path}/${i}` })
+      items.splice(i, 0, items.splice(from, 1)[0])
+      ids.splice(i, 0, ids.splice(from, 1)[0])
+    }
+    operations.push(...diff(items[i], target[i], `${path}/${i}`))
+  })
+  return operations
+}
+
+// 生成把 source 变为 target 的补丁：对象逐键比较；带 id 的数组按 id 对齐，
+// 其他数组逐项比较并在末尾增删；其余情况整体替换
+export const diff = (source: any, target: any, path = ''): PatchOperation[] => {
+  if (JSON.stringify(source) === JSON.stringify(target)) return []
+
+  if (isObject(source) && isObject(target)) {
+    const operations: PatchOperation[] = []
+    const targetKeys = definedKeys(target)
+    definedKeys(source).forEach(key => {
+      if (target[key] === undefined) {
+        operations.push({ op: 'remove', path: `${path}/${escapeToken(key)}` })
+      }
+    })
+    targetKeys.forEach(key => {
+      const childPath = `${path}/${escapeToken(key)}`
+      if (source[key] === undefined) {
+        operations.push({ op: 'add', path: childPath, value: target[key] })
+      } else {
+        operations.push(...diff(source[key], target[key], childPath))
+      }
+    })
+    return operations
+  }
+
+  if (Array.isArray(source) && Array.isArray(target)) {
+    const sourceIds = keyOf(source)
+    const targetIds = keyOf(target)
+    if (sourceIds && targetIds) {
+      return diffKeyed(source, target, sourceIds, targetIds, path)
+    }
+
+    const common = Math.min(source.length, target.length)
+    const operations: PatchOperation[] = []
+    for (let i = 0; i < common; i++) {
+      operations.push(...diff(source[i], target[i], `${path}/${i}`))
+    }
+    for (let i = source.length - 1; i >= common; i--) {
+      operations.push({ op: 'remove', path: `${path}/${i}` })
+    }
+    for (let i = common; i < target.length; i++) {
+      operations.push({ op: 'add', path: `${path}/-`, value: target[i] })
+    }
+    return operations
+  }
+
+  if (target === undefined) {
+    return [{ op: 'remove', path }]
+  }
+  return [{ op: 'replace', path, value: target }]
+}